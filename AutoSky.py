@@ -1,8 +1,6 @@
 import os.path
 import sys
-import json
-import PyVMF_for_AutoSky.src.PyVMF as PyVMF
-import builtinmodelreplace
+import autoskycore
 import tkinter as tk
 import tkinter.ttk as ttk
 import tkinter.messagebox as messagebox
@@ -24,42 +22,16 @@ class AutoSky(ttk.Frame):
 		self.parent.protocol("WM_DELETE_WINDOW",self.close)
 		super().__init__(self.parent, *args, **kwargs)
 
-		#Init default config dictionary and override defaults with the settings specified with config.json, if it exists. (Any settings not specified within config.json will remain default).
-		self.config = {"inputPath":"",
-						"outputPath":"",
-						"skyboxOnly":False,
-						"replaceModels":True,
-						"copyFogSettings":True}
-		p = os.path.join(os.path.dirname(os.path.realpath(__file__)),"config.json")
-		if os.path.exists(p):
-			with open(p,"r") as f:
-				for key, val in json.load(f).items():
-					self.config[key] = val
-		else: #Write default config if no json exists
-			self.writeConfig()
-
-		#Init built-in modelreplace dictionary
-		self.builtinmodelreplace = builtinmodelreplace.dic
-
-		#Init user modelreplace dictionary by loading up all keyvals specified in modelreplace.json, if it exists; else, init an empty dictionary.
-		p = os.path.join(os.path.dirname(os.path.realpath(__file__)),"modelreplace.json")
-		if os.path.exists(p):
-			with open(p,"r") as f:
-				self.usermodelreplace = json.load(f)
-		else:
-			self.usermodelreplace = {}
-			self.writeUserModelreplace()
+		#Init config dictionary. The store (see autoskycore.Store) holds the settings as of the last write, so writeConfig only has to write those changed since
+		self.store = autoskycore.getStore()
+		self.config = autoskycore.loadConfig()
+		self.storedConfig = dict(self.config)
 
-		#For this session, override any models in built-in modelreplace that are specified in user modelreplace
-		remove = []
-		for model in self.usermodelreplace:
-			if model in self.builtinmodelreplace:
-				remove.append(model)
-		for model in remove:
-			del self.builtinmodelreplace[model]
+		#Init built-in, user and full modelreplace dictionaries. Changes to the user modelreplace are written to the store as they're made
+		self.builtinmodelreplace, self.usermodelreplace, self.modelreplace = autoskycore.loadModelreplace()
 
-		#Init full modelreplace dictionary
-		self.modelreplace = {**self.builtinmodelreplace,**self.usermodelreplace}
+		#The generator shares self.modelreplace, so replacements added/removed via the model replacement index take effect on the next run
+		self.generator = autoskycore.SkyboxGenerator(self.modelreplace,ui=self)
 
 		#Instantiate the notebook and both its tabs (Files, Options)
 		self.notebook = ttk.Notebook(self)
@@ -80,183 +52,35 @@ class AutoSky(ttk.Frame):
 		#Initialize all GUI elements to their config-specified settings
 		self.filesTab.setInputPath(self.config["inputPath"])
 		self.filesTab.setOutputPath(self.config["outputPath"])
-		self.optionsTab.setWhetherSkyboxOnly(self.config["skyboxOnly"])
+		self.optionsTab.setExportMode(self.config["skyboxOnly"],self.config["useInstance"])
 		self.optionsTab.setIfUseModelReplace(self.config["replaceModels"])
 		self.optionsTab.setWhetherCopyFogSettings(self.config["copyFogSettings"])
+		self.optionsTab.setWhetherConsolidate(self.config["consolidate"])
+		self.optionsTab.setWhetherOptimizeLightmaps(self.config["optimizeLightmaps"])
 
 	def run(self):
-		self.writeAll()
-		thread = threading.Thread(target=self.generate,args=(self.config["inputPath"],self.config["outputPath"]),
+		self.writeConfig()
+		profiles = autoskycore.getProfiles(self.config)
+		#Keep the parsed input VMF (and everything built from it) around, so the next Generate only redoes what changed. A skybox-only run with a single
+		#profile instead moves the visgroup's contents out of the parse rather than copying them, and the next Generate parses the input VMF again
+		self.generator.preserveInput = not (self.config["skyboxOnly"] and len(profiles) == 1)
+		thread = threading.Thread(target=self.generator.generate,args=(self.config["inputPath"],profiles),
 																kwargs={"skyboxOnly":self.config["skyboxOnly"],
+																		"useInstance":self.config["useInstance"],
 																		"replaceModels":self.config["replaceModels"],
-																		"copyFogSettings":self.config["copyFogSettings"]},
+																		"copyFogSettings":self.config["copyFogSettings"],
+																		"consolidate":self.config["consolidate"],
+																		"optimizeLightmaps":self.config["optimizeLightmaps"]},
 																daemon=True)
 		self.startTime = time.time()
 		self.runBar.run()
 		thread.start()
 
-	def generate(self,inputPath,outputPath,skyboxOnly=True,replaceModels=True,copyFogSettings=True,debugMode=True):
-		parseError = False
-		try:
-			if outputPath[-4:] != ".vmf":
-				self.finishWithError("Invalid output path, or output path is not a VMF.")
-				return
-			if inputPath[-4:] == ".vmf":
-				try:
-					inputVMF = PyVMF.load_vmf(inputPath)
-				except FileNotFoundError:
-					self.finishWithError(f"{inputPath} is not a valid filepath")
-					return
-				except Exception:
-					self.finishWithError("An error occurred parsing {}:\n\n".format(os.path.basename(inputPath)) + traceback.format_exc() + "\nIf you're sure your VMF isn't corrupt or improperly formatted, please report this issue on the AutoSky GitHub with as much information as possible!")
-					print(traceback.format_exc())
-					return
-			else:
-				self.finishWithError("Invalid input path, or input path is not a VMF.")
-				return
-			if inputPath == outputPath:
-				self.finishWithError("Overwriting the input VMF is currently prohibited, as AutoSky is in beta. Please enter a different output path.")
-				return
-
-			outputVMF = PyVMF.new_vmf()
-			outputVMF.versioninfo.editorbuild = inputVMF.versioninfo.editorbuild
-
-			#Copy all solids and prop_statics from AutoSky visgroup into exportVmf
-			items = inputVMF.get_all_from_visgroup("AutoSky",True,not skyboxOnly)
-			if len(items) == 0:
-				yes = self.yesNoQuestion("Continue?","No AutoSky visgroup was found, or if it exists it doesn't contain anything. Proceed with generating an empty skybox?")
-				if not yes:
-					self.finishWithError()
-					return
-			for item in items:
-				item.editor.remove_all_visgroups()
-				item.editor.remove_all_groups()
-				item.editor.visgroupshown = 1
-				if isinstance(item,PyVMF.Solid):
-					outputVMF.add_solids(item)
-				else:
-					outputVMF.add_entities(item)
-
-			#Scale contents of outputVmf by a factor of 1/16, relative to the origin, and replace its prop_statics' models (if replaceModels=True)
-			scaler = 1/16
-			mapOrigin = PyVMF.Vertex(0,0,0)
-			neato = outputVMF.get_solids_and_entities()
-			for item in outputVMF.get_solids_and_entities(True):
-				item.scale(mapOrigin,scaler,scaler,scaler)
-				if replaceModels and isinstance(item,(PyVMF.PropStatic,PyVMF.PropDynamic)):
-					if item.model in self.modelreplace:  #If the prop's model is in the modelreplace dictionary
-						item.model = self.modelreplace[item.model] #Set that prop's model to the replacement specified in the dictionary
-					else:
-						yes = self.yesNoQuestion("Unidentified model",f"The model {item.model} was found in the AutoSky visgroup, but no replacement is specified in the model replacement index. Proceed without replacing it?")
-						if not yes:
-							self.finishWithError()
-							return
-					#This is the only stock skybox prop in TF2 that has a different orientation from the normal scale prop, as far as I know, so we have to rotate it. Thanks Valve
-					if item.model == "models/props_foliage/tree_pine01_4cluster_skybox.mdl":
-						item.angles += PyVMF.Vertex(0,-90,0)
-
-			#Generate sky camera at origin
-			cam = PyVMF.EntityGenerator.sky_camera(mapOrigin)
-			outputVMF.add_entities(cam)
-
-			if copyFogSettings:
-				controller = None
-				for entity in inputVMF.get_entities(True):
-					if isinstance(entity,PyVMF.EnvFogController):
-						controller = entity
-						cam.fogcolor = controller.fogcolor
-						cam.fogcolor2 = controller.fogcolor2
-						cam.fogdir = controller.fogdir
-						cam.fogend = controller.fogend
-						cam.fogmaxdensity = controller.fogmaxdensity
-						cam.fogstart = controller.fogstart
-						cam.fogblend = controller.fogblend
-						cam.fogenable = controller.fogenable
-						cam.use_angles = controller.use_angles
-						break
-
-			#Determine bounds of skybox room
-			xLowerBound = outputVMF.getXExtremity(False)
-			xUpperBound = outputVMF.getXExtremity(True)
-
-			yLowerBound = outputVMF.getYExtremity(False)
-			yUpperBound = outputVMF.getYExtremity(True)
-
-			zLowerBound = outputVMF.getZExtremity(False)
-			zUpperBound = outputVMF.getZExtremity(True)
-
-			#if debugMode:
-			#	print("X extremities:",xLowerBound,xUpperBound)
-			#	print("Y extremities:",yLowerBound,yUpperBound)
-			#	print("Z extremities:",zLowerBound,zUpperBound)
-
-			minBlockUnit = 128
-			gridSnap = 64
-			wallThickness = 16
-
-			numBlocksTowardXLowerBound = abs(xLowerBound // minBlockUnit) + 1
-			numBlocksTowardXUpperBound = abs(xUpperBound // minBlockUnit) + 1
-			totalXHammerUnits = (numBlocksTowardXLowerBound + numBlocksTowardXUpperBound) * minBlockUnit
-
-			numBlocksTowardYLowerBound = abs(yLowerBound // minBlockUnit) + 1
-			numBlocksTowardYUpperBound = abs(yUpperBound // minBlockUnit) + 1
-			totalYHammerUnits = (numBlocksTowardYLowerBound + numBlocksTowardYUpperBound) * minBlockUnit
-
-			numBlocksTowardZLowerBound = abs(zLowerBound // minBlockUnit) + 1
-			numBlocksTowardZUpperBound = abs(zUpperBound // minBlockUnit) + 1
-			totalZHammerUnits = (numBlocksTowardZLowerBound + numBlocksTowardZUpperBound) * minBlockUnit
-
-			room = PyVMF.SolidGenerator.room(mapOrigin,totalXHammerUnits,totalYHammerUnits,totalZHammerUnits,wallThickness)
-
-			#Determine number of x units to move to fix room's x position. Positive if needs to move upward, negative if needs to move downward
-			numBlocksToMoveX = (numBlocksTowardXUpperBound - numBlocksTowardXLowerBound) / 2
-
-			#Determine number of y units to move to fix room's x position. Positive if needs to move upward, negative if needs to move downward
-			numBlocksToMoveY = (numBlocksTowardYUpperBound - numBlocksTowardYLowerBound) / 2
-
-			#Determine number of z units to move to fix room's x position. Positive if needs to move upward, negative if needs to move downward
-			numBlocksToMoveZ = (numBlocksTowardZUpperBound - numBlocksTowardZLowerBound) / 2
-
-			for wall in room:
-				wall.set_texture("tools/toolsskybox")
-				wall.move(numBlocksToMoveX*minBlockUnit,numBlocksToMoveY*minBlockUnit,numBlocksToMoveZ*minBlockUnit)
-			outputVMF.add_solids(*room)
-
-			if not skyboxOnly:
-				#Clear the old skybox from input VMF (anything within its "3D Skybox (AutoSky)" visgroup)
-				inputVMF.delete_visgroup_contents("3D Skybox (AutoSky)")
-
-				#Relocate the new skybox to 192 units below the lowest coordinate in the input VMF (while snapping to 64x64 grid)
-				skyboxCurrentTopZ = outputVMF.getZExtremity(True) - wallThickness
-				skyboxRelocatedTopZ = inputVMF.getZExtremity(False) - (inputVMF.getZExtremity(False) % gridSnap) - 192
-				for item in outputVMF.get_solids_and_entities():
-					item.move(0,0,skyboxRelocatedTopZ-skyboxCurrentTopZ)
-
-				#Copy the new skybox over from outputVMF to inputVMF, and add it to the special "3D Skybox (AutoSky)" visgroup
-				skyboxSolids = outputVMF.get_solids(False,False) #TODO test getting both entities/solids at same time e.g. get_solids_and_entities
-				skyboxEntities = outputVMF.get_entities(False,True)
-				inputVMF.add_solids(*skyboxSolids)
-				inputVMF.add_entities(*skyboxEntities)
-				allSkyboxElements = skyboxSolids + skyboxEntities
-				inputVMF.add_to_visgroup("3D Skybox (AutoSky)",*allSkyboxElements)
-				
-				outputVMF = inputVMF
-			
-			try:
-				outputVMF.export(outputPath)
-			except FileNotFoundError:
-				self.finishWithError(f"{os.path.dirname(outputPath)}/ is not a valid directory")
-				return
-
-		except:
-			self.finishWithError("An unexpected error occurred while generating the skybox:\n\n" + traceback.format_exc() + "\nPlease report this issue on the AutoSky GitHub with as much information as possible!")
-			print(traceback.format_exc())
-			return
-
-		self.finish()
-
-	def finish(self):
+	#report = notes about the run (see SkyboxGenerator.report), shown once it's done
+	def finish(self,report=()):
 		self.runBar.finish("Done! ({:.2f} seconds)".format(time.time() - self.startTime))
+		if len(report) > 0:
+			messagebox.showinfo("Done","\n\n".join(report))
 
 	def finishWithError(self,message=None):
 		self.runBar.finish("Waiting...")
@@ -275,30 +99,44 @@ class AutoSky(ttk.Frame):
 	def addToModelreplace(self,model,skyboxModel):
 		self.usermodelreplace[model] = skyboxModel
 		self.modelreplace[model] = skyboxModel
+		self.store.setModelreplace(model,skyboxModel)
+		self.generator.modelreplaceVersion += 1
 
 	def removeFromModelreplace(self,model):
 		self.usermodelreplace.pop(model,None)
 		self.modelreplace.pop(model,None)
+		self.store.removeModelreplace(model)
+		self.generator.modelreplaceVersion += 1
+
+	#Adds (model, skybox model) pairs in bulk, e.g. from an imported mapping file. As on startup, user replacements override any built-in replacement for the same model
+	def addManyToModelreplace(self,pairs):
+		for model, skyboxModel in pairs:
+			self.builtinmodelreplace.pop(model,None)
+			self.usermodelreplace[model] = skyboxModel
+			self.modelreplace[model] = skyboxModel
+		self.store.setManyModelreplace(pairs)
+		self.generator.modelreplaceVersion += 1
+
+	def removeManyFromModelreplace(self,models):
+		for model in models:
+			self.usermodelreplace.pop(model,None)
+			self.modelreplace.pop(model,None)
+		self.store.removeManyModelreplace(models)
+		self.generator.modelreplaceVersion += 1
 
 	def getModelreplaceLength(self):
 		return len(self.modelreplace)
 
+	#Writes the settings changed since the last write to the store, as a single transaction
 	def writeConfig(self):
-		p = os.path.join(os.path.dirname(os.path.realpath(__file__)),"config.json")
-		with open(p,"w") as f:
-			json.dump(self.config,f,indent=4)
-	
-	def writeUserModelreplace(self):
-		p = os.path.join(os.path.dirname(os.path.realpath(__file__)),"modelreplace.json")
-		with open(p,"w") as f:
-			json.dump(self.usermodelreplace,f,indent=4)
-	
-	def writeAll(self):
-		self.writeConfig()
-		self.writeUserModelreplace()
+		changed = {key:val for key, val in self.config.items() if key not in self.storedConfig or self.storedConfig[key] != val}
+		if len(changed) > 0:
+			self.store.setSettings(changed)
+			self.storedConfig.update(changed)
 
 	def close(self,*args):
-		self.writeAll()
+		self.writeConfig()
+		self.store.close()
 		self.parent.destroy()
 
 	def align(self):
@@ -357,7 +195,7 @@ class OptionsTab(ttk.Frame):
 		self.chooseOutputTypeBar = ttk.Frame(self)
 		self.chooseOutputTypeLabel = Label(self.chooseOutputTypeBar,text="Output type:")
 		self.chooseOutputTypeRadiobuttonVariable = tk.IntVar()
-		self.chooseOutputTypeRadiobuttonVariable.trace("w",self.updateConfigOutputSkyboxOnly)
+		self.chooseOutputTypeRadiobuttonVariable.trace("w",self.updateConfigExportMode)
 		self.chooseOutputTypeRadiobuttonA = ttk.Radiobutton(self.chooseOutputTypeBar,
 															text="3D skybox only",
 															variable=self.chooseOutputTypeRadiobuttonVariable,
@@ -366,6 +204,10 @@ class OptionsTab(ttk.Frame):
 															text="Input VMF with 3D skybox copied in",
 															variable=self.chooseOutputTypeRadiobuttonVariable,
 															value=1)
+		self.chooseOutputTypeRadiobuttonC = ttk.Radiobutton(self.chooseOutputTypeBar,
+															text="Input VMF referencing 3D skybox as an instance",
+															variable=self.chooseOutputTypeRadiobuttonVariable,
+															value=2)
 
 		self.chooseIfUsingModelReplaceBar = ttk.Frame(self)
 		self.modelReplaceCheckbutton = Checkbutton(self.chooseIfUsingModelReplaceBar,text="Use the model replacement index to replace prop models with their 3D skybox versions",configDictAndKeyToUpdate=(self.parent.parent.config,"replaceModels"))
@@ -375,6 +217,12 @@ class OptionsTab(ttk.Frame):
 		self.chooseIfShouldCopyFogSettingsBar = ttk.Frame(self)
 		self.copyFogSettingsCheckbutton = Checkbutton(self.chooseIfShouldCopyFogSettingsBar,text="If the input VMF has an env_fogcontroller, copy all its fog settings to the output skybox's sky_camera",configDictAndKeyToUpdate=(self.parent.parent.config,"copyFogSettings"))
 
+		self.chooseIfShouldConsolidateBar = ttk.Frame(self)
+		self.consolidateCheckbutton = Checkbutton(self.chooseIfShouldConsolidateBar,text="Remove duplicate brushes/props from the skybox, and merge adjacent brushes with matching textures",configDictAndKeyToUpdate=(self.parent.parent.config,"consolidate"))
+
+		self.chooseIfShouldOptimizeLightmapsBar = ttk.Frame(self)
+		self.optimizeLightmapsCheckbutton = Checkbutton(self.chooseIfShouldOptimizeLightmapsBar,text="Coarsen the lightmaps of skybox faces that are large or far from the playable area",configDictAndKeyToUpdate=(self.parent.parent.config,"optimizeLightmaps"))
+
 		self.modelReplaceMenu = None
 
 	def openModelReplaceMenu(self, *args):
@@ -386,10 +234,18 @@ class OptionsTab(ttk.Frame):
 			self.modelReplaceMenu.lift()
 
 	def outputSkyboxOnly(self):
-		return bool(self.chooseOutputTypeRadiobuttonVariable.get())
+		return self.chooseOutputTypeRadiobuttonVariable.get() == 0
+
+	def useInstance(self):
+		return self.chooseOutputTypeRadiobuttonVariable.get() == 2
 
-	def setWhetherSkyboxOnly(self,_bool):
-		self.chooseOutputTypeRadiobuttonVariable.set(int(not _bool))
+	def setExportMode(self,skyboxOnly,useInstance):
+		if skyboxOnly:
+			self.chooseOutputTypeRadiobuttonVariable.set(0)
+		elif useInstance:
+			self.chooseOutputTypeRadiobuttonVariable.set(2)
+		else:
+			self.chooseOutputTypeRadiobuttonVariable.set(1)
 
 	def useModelReplace(self):
 		return self.modelReplaceCheckbutton.isChecked()
@@ -403,32 +259,55 @@ class OptionsTab(ttk.Frame):
 	def setWhetherCopyFogSettings(self,_bool):
 		self.copyFogSettingsCheckbutton.setChecked(_bool)
 
-	def updateConfigOutputSkyboxOnly(self,*args):
-		self.parent.parent.config["skyboxOnly"] = not bool(self.chooseOutputTypeRadiobuttonVariable.get())
+	def consolidate(self):
+		return self.consolidateCheckbutton.isChecked()
+
+	def setWhetherConsolidate(self,_bool):
+		self.consolidateCheckbutton.setChecked(_bool)
+
+	def optimizeLightmaps(self):
+		return self.optimizeLightmapsCheckbutton.isChecked()
+
+	def setWhetherOptimizeLightmaps(self,_bool):
+		self.optimizeLightmapsCheckbutton.setChecked(_bool)
+
+	def updateConfigExportMode(self,*args):
+		self.parent.parent.config["skyboxOnly"] = self.outputSkyboxOnly()
+		self.parent.parent.config["useInstance"] = self.useInstance()
 
 	def gridChildren(self):
 		self.chooseOutputTypeBar.grid(row=0,column=0,sticky="w")
 		self.chooseOutputTypeLabel.grid(row=0,column=0,padx=4,pady=(6,0))
 		self.chooseOutputTypeRadiobuttonA.grid(row=0,column=1,padx=4,pady=(6,0))
 		self.chooseOutputTypeRadiobuttonB.grid(row=0,column=2,padx=4,pady=(6,0))
+		self.chooseOutputTypeRadiobuttonC.grid(row=0,column=3,padx=4,pady=(6,0))
 
 		self.chooseIfUsingModelReplaceBar.grid(row=1,column=0,sticky="w")
 		self.modelReplaceCheckbutton.grid(row=1,column=0,padx=4,pady=2)
 		self.modelReplaceMenuOpenButton.grid(row=1,column=1,padx=2,pady=2)
 
 		self.chooseIfShouldCopyFogSettingsBar.grid(row=2,column=0,sticky="w")
-		self.copyFogSettingsCheckbutton.grid(row=2,column=0,padx=4,pady=(0,6))
+		self.copyFogSettingsCheckbutton.grid(row=2,column=0,padx=4,pady=(0,2))
+
+		self.chooseIfShouldConsolidateBar.grid(row=3,column=0,sticky="w")
+		self.consolidateCheckbutton.grid(row=3,column=0,padx=4,pady=(0,2))
 
+		self.chooseIfShouldOptimizeLightmapsBar.grid(row=4,column=0,sticky="w")
+		self.optimizeLightmapsCheckbutton.grid(row=4,column=0,padx=4,pady=(0,6))
+
+#Window listing the model replacement index. The tree is virtualized: only the rows within the visible viewport ever exist as Treeview items, and scrolling/searching just
+#re-populates those few rows from self.results, so opening and filtering stay fast no matter how large the index is
 class ModelReplaceMenu(tk.Toplevel):
 	def __init__(self, parent, *args, **kwargs):
 		super().__init__(parent, *args, **kwargs)
 		self.parent = parent
+		self.app = self.parent.parent.parent
 		self.title("Model replacement index")
 		self["height"] = 256
 		self["width"] = 512
 		self.minsize(645,320)
 
-		self.customreplacementmarker = tk.PhotoImage(file=os.path.join(self.parent.parent.parent.resourcePath,"customreplacementmarker.png"))
+		self.customreplacementmarker = tk.PhotoImage(file=os.path.join(self.app.resourcePath,"customreplacementmarker.png"))
 
 		self.mainframe = ttk.Frame(self,padding=(8,8,8,8))
 		self.topframe = ttk.Frame(self.mainframe)
@@ -436,9 +315,16 @@ class ModelReplaceMenu(tk.Toplevel):
 		self.topsublabel_img = Label(self.topframe,image=self.customreplacementmarker)
 		self.topsublabel = Label(self.topframe,text="indicates custom-specified replacements")
 
+		self.searchframe = ttk.Frame(self.mainframe)
+		self.searchLabel = Label(self.searchframe,text="Search:")
+		self.searchEntry = EntryWithDefaultText(self.searchframe,width=60,text="models/props_mining/")
+		self.searchEntry.textvariable.trace("w",self.updateSearch)
+		self.countLabel = Label(self.searchframe)
+
 		self.middleframe = ttk.Frame(self.mainframe)
 
-		self.tree = ttk.Treeview(self.middleframe)
+		self.visibleRows = 16 #Updated to fit the tree's actual height whenever it's resized
+		self.tree = ttk.Treeview(self.middleframe,height=self.visibleRows)
 		self.tree["columns"] = ("#1")
 
 		self.tree.column("#0",width=300)
@@ -448,25 +334,94 @@ class ModelReplaceMenu(tk.Toplevel):
 		self.tree.heading("#1",text="Skybox model")
 
 		self.scrollBar = ttk.Scrollbar(self.middleframe)
-		self.scrollBar.configure(command=self.tree.yview)
-		self.tree.configure(yscrollcommand=self.scrollBar.set)
+		self.scrollBar.configure(command=self.scroll)
+
+		self.tree.bind("<<TreeviewSelect>>",self.updateSelection)
+		self.tree.bind("<MouseWheel>",self.mouseWheel)
+		self.tree.bind("<Button-4>",self.mouseWheel)
+		self.tree.bind("<Button-5>",self.mouseWheel)
+		self.tree.bind("<Configure>",self.resize)
 
 		#self.tree.bind("<Double-1>",self.openEditWindow)
 
 		self.bottomframe = ttk.Frame(self.mainframe)
 		self.addButton = ttk.Button(self.bottomframe,text="Add custom replacements",command=self.openAddWindow)
 		self.removeButton = ttk.Button(self.bottomframe,text="Remove selected",command=self.removeSelectedFromModelreplace)
+		self.importButton = ttk.Button(self.bottomframe,text="Import...",command=self.importModelreplace)
+		self.exportButton = ttk.Button(self.bottomframe,text="Export...",command=self.exportModelreplace)
 
 		self.addModelWindow = None
 		#self.editModelWindow = None
 
 		self.protocol("WM_DELETE_WINDOW",self.close)
 
-		for model, skyboxModel in parent.parent.parent.builtinmodelreplace.items():
-			self.tree.insert("",0,text=model,values=(skyboxModel))
-		for model, skyboxModel in parent.parent.parent.usermodelreplace.items():
-			self.tree.insert("", 0, text=model, values=(skyboxModel),image=self.customreplacementmarker)
+		self.index = autoskycore.ModelReplaceIndex(self.app.builtinmodelreplace,self.app.usermodelreplace)
+		self.results = self.index.search("")
+		self.offset = 0 #Position within self.results of the topmost visible row
+		self.selectedModels = set()
+		self.rowModels = {} #Treeview item id -> model, for the rows currently on screen
+		self.render()
+
+	#Re-populates the tree with the rows of self.results currently scrolled into view
+	def render(self):
+		self.offset = max(0,min(self.offset,len(self.results) - self.visibleRows))
+		self.tree.delete(*self.tree.get_children())
+		self.rowModels = {}
+		selection = []
+		for i in self.results[self.offset:self.offset+self.visibleRows]:
+			model = self.index.models[i]
+			if self.index.isCustom(model):
+				item = self.tree.insert("","end",text=model,values=(self.index.getSkyboxModel(model),),image=self.customreplacementmarker)
+			else:
+				item = self.tree.insert("","end",text=model,values=(self.index.getSkyboxModel(model),))
+			self.rowModels[item] = model
+			if model in self.selectedModels:
+				selection.append(item)
+		self.tree.selection_set(selection)
+		if len(self.results) > 0:
+			self.scrollBar.set(self.offset/len(self.results),min(1,(self.offset+self.visibleRows)/len(self.results)))
+		else:
+			self.scrollBar.set(0,1)
+		self.countLabel.setText(f"{len(self.results)} of {len(self.index)} models")
+
+	def scroll(self,action,amount,unit=None):
+		if action == "moveto":
+			self.offset = int(float(amount) * len(self.results))
+		elif unit == "pages":
+			self.offset += int(amount) * self.visibleRows
+		else:
+			self.offset += int(amount)
+		self.render()
+
+	def mouseWheel(self,event):
+		if event.num == 4 or event.delta > 0:
+			self.scroll("scroll",-3,"units")
+		else:
+			self.scroll("scroll",3,"units")
+		return "break"
+
+	def resize(self,event):
+		children = self.tree.get_children()
+		bbox = self.tree.bbox(children[0]) if len(children) > 0 else None
+		if not bbox:
+			return
+		rows = max(1,(event.height - bbox[1]) // bbox[3])
+		if rows != self.visibleRows:
+			self.visibleRows = rows
+			self.render()
+
+	def updateSelection(self,*args):
+		selection = self.tree.selection()
+		for item, model in self.rowModels.items():
+			if item in selection:
+				self.selectedModels.add(model)
+			else:
+				self.selectedModels.discard(model)
 
+	def updateSearch(self,*args):
+		self.results = self.index.search(self.searchEntry.getText())
+		self.offset = 0
+		self.render()
 
 	def grid(self,**kwargs):
 		self.mainframe.grid(row=0,column=0,sticky="nswe")
@@ -474,20 +429,27 @@ class ModelReplaceMenu(tk.Toplevel):
 		self.toplabel.grid(row=0,column=0)
 		self.topsublabel_img.grid(row=1,column=0,sticky="w")
 		self.topsublabel.grid(row=1,column=0,sticky='w',padx=(20,0))
-		self.middleframe.grid(row=1,column=0,sticky="nswe")
+		self.searchframe.grid(row=1,column=0,sticky="we",pady=(8,0))
+		self.searchLabel.grid(row=0,column=0,padx=(0,4))
+		self.searchEntry.grid(row=0,column=1,sticky="we")
+		self.countLabel.grid(row=0,column=2,padx=(8,0))
+		self.middleframe.grid(row=2,column=0,sticky="nswe")
 		self.tree.grid(row=0,column=0,pady=8,sticky="nswe")
 		self.scrollBar.grid(row=0,column=1,sticky="nswe")
-		self.bottomframe.grid(row=2,column=0)
+		self.bottomframe.grid(row=3,column=0)
 		self.addButton.grid(row=0,column=0)
 		self.removeButton.grid(row=0,column=1)
+		self.importButton.grid(row=0,column=2,padx=(8,0))
+		self.exportButton.grid(row=0,column=3)
 
 		self.columnconfigure(0,weight=1)
 		self.mainframe.columnconfigure(0,weight=1)
 		self.topframe.columnconfigure(0,weight=1)
+		self.searchframe.columnconfigure(1,weight=1)
 		self.middleframe.columnconfigure(0, weight=1)
 
 		self.rowconfigure(0, weight=1)
-		self.mainframe.rowconfigure(1,weight=1)
+		self.mainframe.rowconfigure(2,weight=1)
 		self.middleframe.rowconfigure(0,weight=1)
 
 	def openAddWindow(self,*args):
@@ -508,30 +470,52 @@ class ModelReplaceMenu(tk.Toplevel):
 		self.update_idletasks()
 		width = self.winfo_width()
 		height = self.winfo_height()
-		self.geometry('{}x{}+{}+{}'.format(width, height, self.parent.parent.parent.parent.winfo_x() + 32, self.parent.parent.parent.parent.winfo_y() + 32))
+		self.geometry('{}x{}+{}+{}'.format(width, height, self.app.parent.winfo_x() + 32, self.app.parent.winfo_y() + 32))
 
 	def addToModelreplace(self,model,skyboxModel):
-		self.tree.insert("",0,text=model,values=(skyboxModel),image=self.customreplacementmarker)
-		self.parent.parent.parent.addToModelreplace(model,skyboxModel)
+		self.app.addToModelreplace(model,skyboxModel)
+		self.index.add(model)
+		self.updateSearch()
 
 	def removeSelectedFromModelreplace(self,*args):
-		models = []
-		cancel = False
-		for model in self.tree.selection():
-			d = self.tree.item(model)
-			if d["text"] in self.parent.parent.parent.builtinmodelreplace:
-				cancel = True
+		models = list(self.selectedModels)
+		for model in models:
+			if not self.index.isCustom(model):
 				messagebox.showerror("Error", "One or more of the selected model(s) is in the built-in replacement index and can't be deleted.", parent=self)
-				break
-			else:
-				models.append(model)
-		if not cancel:
-			for model in models:
-				d = self.tree.item(model)
-				del self.parent.parent.parent.modelreplace[d["text"]]
-				del self.parent.parent.parent.usermodelreplace[d["text"]]
-			self.tree.delete(*models)
-			
+				return
+		self.app.removeManyFromModelreplace(models)
+		self.index.remove(*models)
+		self.selectedModels.clear()
+		self.results = self.index.search(self.searchEntry.getText())
+		self.render()
+
+	def importModelreplace(self,*args):
+		path = filedialog.askopenfilename(title="Import model replacements",filetypes=[("Model replacement mapping","*.csv *.json"),("CSV","*.csv"),("JSON","*.json")],parent=self)
+		if path == "":
+			return
+		try:
+			pairs = autoskycore.readModelreplaceFile(path)
+		except Exception:
+			messagebox.showerror("Error",f"An error occurred reading {os.path.basename(path)}:\n\n" + traceback.format_exc(),parent=self)
+			return
+		self.app.addManyToModelreplace(pairs)
+		self.index.rebuild()
+		self.updateSearch()
+		messagebox.showinfo("Import complete",f"Imported {len(pairs)} replacement(s) from {os.path.basename(path)}.",parent=self)
+
+	#Exports every replacement matching the current search (i.e. the whole index if the search field is empty)
+	def exportModelreplace(self,*args):
+		path = filedialog.asksaveasfilename(title="Export model replacements",filetypes=[("CSV","*.csv"),("JSON","*.json")],defaultextension=".csv",parent=self)
+		if path == "":
+			return
+		models = [self.index.models[i] for i in self.results]
+		try:
+			autoskycore.writeModelreplaceFile(path,[(model,self.index.getSkyboxModel(model)) for model in models])
+		except OSError:
+			messagebox.showerror("Error",f"Couldn't write to {path}",parent=self)
+			return
+		messagebox.showinfo("Export complete",f"Exported {len(models)} replacement(s) to {os.path.basename(path)}.",parent=self)
+		
 	"""
 	def openEditWindow(self,*args):
 		if self.editModelWindow is None:
@@ -735,7 +719,7 @@ class VMFSearchButton(ttk.Button):
 
 	def chooseVMF(self, *args):
 		if self.entry is not None:
-			self.entry.setText(filedialog.askopenfilename(title="Select a VMF",filetypes=[("Valve Map File","*.vmf")]))
+			self.entry.setText(filedialog.askopenfilename(title="Select a VMF",filetypes=[("Valve Map File","*.vmf *.vmf.gz *.vmf.zst")]))
 
 #VMF save button that automatically populates the given Entry field with the path string of the VMF being saved. Don't supply it a command argument, since it handles this internally
 class VMFSaveButton(ttk.Button):
@@ -748,9 +732,10 @@ class VMFSaveButton(ttk.Button):
 
 	def saveVMF(self, *args):
 		if self.entry is not None:
-			self.entry.setText(filedialog.asksaveasfilename(title="Save VMF",filetypes=[("Valve Map File","*.vmf")],defaultextension=".vmf"))
+			self.entry.setText(filedialog.asksaveasfilename(title="Save VMF",filetypes=[("Valve Map File","*.vmf"),("Compressed Valve Map File","*.vmf.gz *.vmf.zst")],defaultextension=".vmf"))
 
-app = AutoSky(padding=(8,8,8,8))
-app.grid(row=0,column=0)
-app.align()
-app.mainloop()
+if __name__ == "__main__":
+	app = AutoSky(padding=(8,8,8,8))
+	app.grid(row=0,column=0)
+	app.align()
+	app.mainloop()
@@ -0,0 +1,243 @@
+import os.path
+import sys
+import json
+import time
+import argparse
+import collections
+import urllib.request
+import urllib.error
+
+#Local generation daemon. "AutoSkyDaemon.py serve" starts a localhost HTTP server that keeps recently parsed VMFs (and their visgroup contents) and the merged
+#model replacement index in memory, so a generate request only pays for the generation itself. "AutoSkyDaemon.py generate" is the thin client, suitable for
+#running from Hammer's compile configuration as a pre-compile step; it only imports the standard library modules above, so it starts almost instantly.
+#The heavy imports (PyVMF and the built-in model index) only happen when serving.
+
+defaultPort = 47116
+
+#Secret shared by the daemon and the client through a file next to AutoSky (alongside autosky.db) that only the user can read. Every request must carry it, so
+#other local processes, and web pages (which can make a browser send requests to localhost), can't have the daemon write files or rewrite maps
+tokenPath = os.path.join(os.path.dirname(os.path.realpath(__file__)),"daemon.token")
+tokenHeader = "X-AutoSky-Token"
+
+#Returns the install's token, creating it first if create=True and there isn't one yet
+def readToken(create=False):
+	if create and not os.path.exists(tokenPath):
+		import secrets
+		fd = os.open(tokenPath,os.O_WRONLY | os.O_CREAT | os.O_EXCL,0o600)
+		with os.fdopen(fd,"w") as f:
+			f.write(secrets.token_hex(32))
+	with open(tokenPath,"r") as f:
+		return f.read().strip()
+
+#SkyboxGenerator that reuses parsed VMFs between runs. VMFs are keyed by path, modification time and size, so a VMF saved since it was parsed is parsed again,
+#and the least recently used VMF is dropped once more than maxVMFs are held
+def makeCachingGenerator(autoskycore):
+	class CachingSkyboxGenerator(autoskycore.SkyboxGenerator):
+		def __init__(self,modelreplace,maxVMFs=4):
+			super().__init__(modelreplace)
+			self.preserveInput = True
+			self.maxVMFs = maxVMFs
+			self.vmfs = collections.OrderedDict() #(path, mtime, size) -> parsed VMF
+			self.visgroups = {} #(id of parsed VMF, visgroup name) -> visgroup contents
+
+		def getKey(self,path):
+			stat = os.stat(path)
+			return (os.path.abspath(path),stat.st_mtime_ns,stat.st_size)
+
+		def loadVMF(self,path):
+			key = self.getKey(path)
+			if key in self.vmfs:
+				self.vmfs.move_to_end(key)
+				return self.vmfs[key]
+			self.evict(key[0])
+			vmf = super().loadVMF(path)
+			self.vmfs[key] = vmf
+			while len(self.vmfs) > self.maxVMFs:
+				self.forget(*self.vmfs.popitem(last=False))
+			return vmf
+
+		def getVisgroupContents(self,vmf,name):
+			key = (id(vmf),name)
+			if key not in self.visgroups:
+				self.visgroups[key] = super().getVisgroupContents(vmf,name)
+			return self.visgroups[key]
+
+		def inputModified(self,path):
+			super().inputModified(path)
+			self.evict(os.path.abspath(path))
+
+		#Drops every parsed version of the VMF at (absolute) path
+		def evict(self,path):
+			for key in [key for key in self.vmfs if key[0] == path]:
+				self.forget(key,self.vmfs.pop(key))
+
+		#Drops everything kept for the parsed VMF vmf (stored under key), including whatever the pipeline built from it, so none of it stays in memory
+		def forget(self,key,vmf):
+			for visgroupKey in [visgroupKey for visgroupKey in self.visgroups if visgroupKey[0] == id(vmf)]:
+				del self.visgroups[visgroupKey]
+			path, mtime, size = key
+			self.pipeline.discardWhere(lambda scope: "inputPath" in scope and os.path.abspath(scope["inputPath"]) == path and scope["inputStamp"] == (mtime,size))
+
+		def getStatus(self):
+			return {"vmfs":[key[0] for key in self.vmfs],"models":len(self.modelreplace)}
+
+	return CachingSkyboxGenerator
+
+def serve(port,maxVMFs):
+	import http.server
+	import hmac
+	import autoskycore
+
+	token = readToken(True)
+
+	CachingSkyboxGenerator = makeCachingGenerator(autoskycore)
+	store = autoskycore.getStore()
+	state = {"generator":None,"storeVersion":None}
+
+	#Returns the generator, reloading the model replacement index first if the store has been changed since it was loaded (e.g. edited from the GUI)
+	def getGenerator():
+		storeVersion = store.getVersion()
+		if state["generator"] is None:
+			state["generator"] = CachingSkyboxGenerator(autoskycore.loadModelreplace()[2],maxVMFs)
+		elif storeVersion != state["storeVersion"]:
+			state["generator"].modelreplace = autoskycore.loadModelreplace()[2]
+			state["generator"].modelreplaceVersion += 1
+		state["storeVersion"] = storeVersion
+		return state["generator"]
+
+	class RequestHandler(http.server.BaseHTTPRequestHandler):
+		#Returns whether the request may be handled, responding with an error if not. Requests must carry the token, and browsers' requests (which always have
+		#an Origin header when cross-origin, and can't set custom headers or a JSON content type without a preflight the daemon never answers) are turned away
+		def isAllowed(self,needsBody):
+			if self.headers.get("Origin") is not None:
+				self.respond(403,{"error":"Requests from web pages aren't accepted"})
+				return False
+			if not hmac.compare_digest(self.headers.get(tokenHeader,""),token):
+				self.respond(403,{"error":f"Missing or wrong {tokenHeader} header (see {tokenPath})"})
+				return False
+			if needsBody and self.headers.get("Content-Type","").split(";")[0].strip().lower() != "application/json":
+				self.respond(415,{"error":"The request body must be sent as application/json"})
+				return False
+			return True
+
+		def do_GET(self):
+			if not self.isAllowed(False):
+				return
+			if self.path != "/status":
+				self.respond(404,{"error":"Unknown path"})
+				return
+			self.respond(200,getGenerator().getStatus())
+
+		def do_POST(self):
+			if not self.isAllowed(True):
+				return
+			if self.path != "/generate":
+				self.respond(404,{"error":"Unknown path"})
+				return
+			try:
+				request = json.loads(self.rfile.read(int(self.headers.get("Content-Length",0))))
+			except ValueError:
+				self.respond(400,{"error":"Request body isn't valid JSON"})
+				return
+
+			#Any options the request leaves out are taken from the stored settings, as the GUI would use them
+			config = autoskycore.loadConfig()
+			for key, val in request.items():
+				config[key] = val
+
+			generator = getGenerator()
+			generator.defaultAnswer = not request.get("strict",False)
+			startTime = time.time()
+			generator.generate(config["inputPath"],autoskycore.getProfiles(config),
+								skyboxOnly=config["skyboxOnly"],
+								useInstance=config["useInstance"],
+								replaceModels=config["replaceModels"],
+								copyFogSettings=config["copyFogSettings"],
+								consolidate=config["consolidate"],
+								optimizeLightmaps=config["optimizeLightmaps"])
+			if generator.error is not None:
+				self.respond(500,{"error":generator.error})
+			else:
+				self.respond(200,{"seconds":time.time() - startTime,"report":generator.report})
+
+		def respond(self,code,body):
+			data = json.dumps(body).encode()
+			self.send_response(code)
+			self.send_header("Content-Type","application/json")
+			self.send_header("Content-Length",str(len(data)))
+			self.end_headers()
+			self.wfile.write(data)
+
+	#A plain (single-threaded) HTTPServer, so requests are handled one at a time and never share a parsed VMF mid-generation
+	server = http.server.HTTPServer(("127.0.0.1",port),RequestHandler)
+	print(f"AutoSky daemon listening on 127.0.0.1:{port}")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+
+def request(port,path,body=None):
+	data = None if body is None else json.dumps(body).encode()
+	req = urllib.request.Request(f"http://127.0.0.1:{port}{path}",data=data,headers={"Content-Type":"application/json",tokenHeader:readToken()})
+	try:
+		with urllib.request.urlopen(req) as response:
+			return response.status, json.load(response)
+	except urllib.error.HTTPError as e:
+		return e.code, json.load(e)
+
+def main(args=None):
+	parser = argparse.ArgumentParser(description="Local AutoSky generation daemon and client")
+	parser.add_argument("--port",type=int,default=defaultPort)
+	subparsers = parser.add_subparsers(dest="command",required=True)
+
+	serveParser = subparsers.add_parser("serve",help="Run the daemon")
+	serveParser.add_argument("--max-vmfs",type=int,default=4,help="How many parsed VMFs to keep in memory")
+
+	generateParser = subparsers.add_parser("generate",help="Ask a running daemon to generate a skybox. Options not given are taken from the stored settings")
+	generateParser.add_argument("inputPath",nargs="?")
+	generateParser.add_argument("outputPath",nargs="?")
+	generateParser.add_argument("--skybox-only",dest="skyboxOnly",action="store_true",default=None)
+	generateParser.add_argument("--copy-in",dest="skyboxOnly",action="store_false",default=None)
+	generateParser.add_argument("--instance",dest="useInstance",action="store_true",default=None)
+	generateParser.add_argument("--no-model-replace",dest="replaceModels",action="store_false",default=None)
+	generateParser.add_argument("--no-fog",dest="copyFogSettings",action="store_false",default=None)
+	generateParser.add_argument("--no-consolidate",dest="consolidate",action="store_false",default=None)
+	generateParser.add_argument("--no-lightmap-optimization",dest="optimizeLightmaps",action="store_false",default=None)
+	generateParser.add_argument("--strict",action="store_true",help="Fail instead of proceeding when AutoSky would ask a question (e.g. about an unidentified model)")
+
+	subparsers.add_parser("status",help="Show what a running daemon has cached")
+
+	args = parser.parse_args(args)
+	if args.command == "serve":
+		serve(args.port,args.max_vmfs)
+		return 0
+
+	if not os.path.exists(tokenPath):
+		print("No AutoSky daemon has been set up yet; start one with \"AutoSkyDaemon.py serve\"",file=sys.stderr)
+		return 2
+	try:
+		if args.command == "status":
+			code, body = request(args.port,"/status")
+		else:
+			body = {key:val for key, val in vars(args).items() if key in ("inputPath","outputPath","skyboxOnly","useInstance","replaceModels","copyFogSettings","consolidate","optimizeLightmaps","strict") and val is not None}
+			#The daemon resolves relative paths against its own working directory, not the client's
+			for key in ("inputPath","outputPath"):
+				if key in body:
+					body[key] = os.path.abspath(body[key])
+			code, body = request(args.port,"/generate",body)
+	except urllib.error.URLError:
+		print(f"No AutoSky daemon is running on port {args.port}; start one with \"AutoSkyDaemon.py serve\"",file=sys.stderr)
+		return 2
+	if code != 200:
+		print(body["error"],file=sys.stderr)
+		return 1
+	if args.command == "status":
+		print(json.dumps(body,indent=4))
+	else:
+		for line in body["report"]:
+			print(line)
+		print("Done! ({:.2f} seconds)".format(body["seconds"]))
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
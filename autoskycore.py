@@ -0,0 +1,1514 @@
+import os.path
+import sys
+import json
+import csv
+import bisect
+import importlib
+import traceback
+import shutil
+import copy
+import hashlib
+import threading
+import collections
+import tempfile
+import math
+
+#The importable core of AutoSky: skybox generation, config/profile loading and the model replacement index, without any GUI. Importing it is kept cheap
+#(see startupBudget) by deferring everything heavy until it's first needed: PyVMF is only imported once a VMF is loaded or created, and the built-in model
+#replacement index once loadModelreplace is first called
+
+#Module that isn't imported until one of its attributes is first accessed
+class LazyModule:
+	def __init__(self,name):
+		self.name = name
+		self.module = None
+
+	def __getattr__(self,attr):
+		if self.module is None:
+			self.module = importlib.import_module(self.name)
+		return getattr(self.module,attr)
+
+PyVMF = LazyModule("PyVMF_for_AutoSky.src.PyVMF")
+
+#NumPy is optional: it's only needed to scale displacements as whole arrays (see Displacement) and to check the skybox's brushes (see validateSolids), and is
+#imported the first time either is attempted
+def importNumpy():
+	try:
+		import numpy
+	except ImportError:
+		return None
+	return numpy
+
+#Extensions of the compressed VMFs AutoSky can read and write. zstd-compressed VMFs need the optional zstandard package
+compressedExtensions = (".vmf.gz",".vmf.zst")
+
+#How much is read/written at a time when streaming files through a codec
+chunkSize = 1 << 20
+
+#gzip's compression level. gzip defaults to 9, which compresses a large VMF many times slower than 6 for little gain
+gzipLevel = 6
+
+def isVMFPath(path):
+	return path.lower().endswith((".vmf",) + compressedExtensions)
+
+def importZstandard(path):
+	try:
+		import zstandard
+	except ImportError:
+		raise RuntimeError(f"Reading or writing {os.path.basename(path)} requires the zstandard package (pip install zstandard)")
+	return zstandard
+
+#Returns a stream that decompresses (mode="rb") or compresses (mode="wb") the already open file-like fileobj, named path, if path ends with .gz or .zst;
+#otherwise returns fileobj itself. fileobj is left open when the returned stream is closed
+def wrapCompressed(fileobj,path,mode):
+	lower = path.lower()
+	if lower.endswith(".gz"):
+		import gzip
+		return gzip.GzipFile(fileobj=fileobj,mode=mode,compresslevel=gzipLevel)
+	if lower.endswith(".zst"):
+		zstandard = importZstandard(path)
+		if mode == "rb":
+			return zstandard.ZstdDecompressor().stream_reader(fileobj,closefd=False)
+		return zstandard.ZstdCompressor().stream_writer(fileobj,closefd=False)
+	return fileobj
+
+#How many chunks may be waiting to be passed on between the threads of pipeFile
+pipelineDepth = 8
+
+#Read end of a queue of chunks fed by another thread, as a file-like object. A chunk of b"" marks the end; an exception put on the queue is raised by read
+class QueueReader:
+	def __init__(self,chunks):
+		self.chunks = chunks
+		self.buffer = b""
+		self.ended = False
+
+	def readable(self):
+		return True
+
+	def read(self,size=-1):
+		while not self.ended and (size < 0 or len(self.buffer) < size):
+			chunk = self.chunks.get()
+			if isinstance(chunk,BaseException):
+				raise chunk
+			if chunk == b"":
+				self.ended = True
+			self.buffer += chunk
+		if size < 0:
+			size = len(self.buffer)
+		data, self.buffer = self.buffer[:size], self.buffer[size:]
+		return data
+
+	def close(self):
+		pass
+
+#Write end of a queue of chunks drained by another thread, as a file-like object. Each write blocks while the queue is full, and raises any exception the
+#other thread has hit (see pipeFile)
+class QueueWriter:
+	def __init__(self,chunks,errors):
+		self.chunks = chunks
+		self.errors = errors
+
+	def writable(self):
+		return True
+
+	def write(self,data):
+		if len(self.errors) > 0:
+			raise self.errors[0]
+		if len(data) > 0:
+			self.chunks.put(bytes(data))
+		return len(data)
+
+	def flush(self):
+		pass
+
+	def close(self):
+		pass
+
+#Copies sourcePath to targetPath, decompressing the source and/or compressing the target according to their extensions (see wrapCompressed). Reading the
+#source, (de)compressing and writing the target each run on their own thread, handing chunks along bounded queues, so the copy takes about as long as the
+#slowest of the three rather than all three together, and never holds more than a few chunks in memory.
+#Only the compressed VMFs' (de)compression is pipelined this way. PyVMF parses and exports whole files, so parsing can't start before the input is fully read
+#(and decompressed), transforming can't start before parsing is done, and writing can't start before the whole VMF is serialized. Plain .vmf files are read
+#and written by PyVMF itself, one step after another
+def pipeFile(sourcePath,targetPath):
+	import queue
+	stopped = threading.Event()
+	readChunks = queue.Queue(pipelineDepth)
+	writeChunks = queue.Queue(pipelineDepth)
+	writeErrors = []
+
+	#Puts item on chunks, unless the copy is stopped while waiting for space
+	def put(chunks,item):
+		while not stopped.is_set():
+			try:
+				chunks.put(item,timeout=0.1)
+				return
+			except queue.Full:
+				pass
+
+	def read():
+		try:
+			with open(sourcePath,"rb") as f:
+				while not stopped.is_set():
+					chunk = f.read(chunkSize)
+					put(readChunks,chunk)
+					if chunk == b"":
+						return
+		except BaseException as e:
+			put(readChunks,e)
+
+	#Once writing fails, keeps draining the queue so the (de)compressing thread never blocks on it before noticing
+	def write():
+		f = None
+		try:
+			f = open(targetPath,"wb")
+		except BaseException as e:
+			writeErrors.append(e)
+		while True:
+			chunk = writeChunks.get()
+			if chunk is None:
+				break
+			if len(writeErrors) == 0:
+				try:
+					f.write(chunk)
+				except BaseException as e:
+					writeErrors.append(e)
+		if f is not None:
+			f.close()
+
+	reader = threading.Thread(target=read,daemon=True)
+	writer = threading.Thread(target=write,daemon=True)
+	reader.start()
+	writer.start()
+	try:
+		source = wrapCompressed(QueueReader(readChunks),sourcePath,"rb")
+		target = wrapCompressed(QueueWriter(writeChunks,writeErrors),targetPath,"wb")
+		shutil.copyfileobj(source,target,chunkSize)
+		target.close()
+		source.close()
+	finally:
+		stopped.set()
+		writeChunks.put(None)
+		writer.join()
+	if len(writeErrors) > 0:
+		raise writeErrors[0]
+
+#Maximum time, in milliseconds, that importing this module may take. Checked by running this module as a script (python autoskycore.py), e.g. as part of a release build
+startupBudget = 50
+
+#Settings for a single generated skybox. The config may list any number of profiles under "profiles", each overriding some or all of these; every profile is generated from the same parse of the input VMF
+defaultProfile = {"visgroup":"AutoSky", #Visgroup in the input VMF whose contents make up the skybox
+					"skyboxVisgroup":"3D Skybox (AutoSky)", #Visgroup the skybox is placed in when copied into the input VMF
+					"scale":16, #The skybox is built at 1/scale size, and its sky_camera given this scale
+					"minBlockUnit":128, #The skybox room's dimensions are multiples of this
+					"wallThickness":16,
+					"gridSnap":64,
+					"offset":192, #How far below the input VMF's lowest point the skybox is placed when copied in
+					"minLightmapScale":16, #Bounds for the lightmap scales chosen for the skybox's faces (see optimizeLightmaps)
+					"maxLightmapScale":128,
+					"outputPath":""}
+
+#Default settings, overridden by whatever the store holds (see Store)
+defaultConfig = {"inputPath":"",
+				"outputPath":"",
+				"skyboxOnly":False,
+				"useInstance":False,
+				"replaceModels":True,
+				"copyFogSettings":True,
+				"consolidate":True,
+				"optimizeLightmaps":True,
+				"profiles":[]}
+
+#Path of a file kept alongside AutoSky itself, e.g. autosky.db
+def getDataPath(name):
+	return os.path.join(os.path.dirname(os.path.realpath(__file__)),name)
+
+#Settings and the user model replacement index, kept in an SQLite database (autosky.db) alongside AutoSky. Every change is written as its own small transaction
+#(a single-row upsert or delete, or one transaction for a bulk edit), so nothing is rewritten wholesale and an interrupted write never leaves a half-written
+#file behind. A config.json or modelreplace.json found alongside the database is imported into the store the next time it's opened (overriding any stored settings
+#or replacements it specifies) and then renamed to *.imported; this migrates the JSON files older versions wrote, and is also how settings such as profiles
+#can be edited by hand
+class Store:
+	def __init__(self,path=None):
+		import sqlite3
+		self.path = path if path is not None else getDataPath("autosky.db")
+		self.lock = threading.Lock()
+		#The GUI writes from its main thread but the daemon may read from another, so the connection isn't tied to the thread that opened it; self.lock serializes its use
+		self.connection = sqlite3.connect(self.path,check_same_thread=False)
+		with self.lock, self.connection:
+			#Write-ahead logging lets another process (e.g. the daemon) read while the GUI writes
+			self.connection.execute("PRAGMA journal_mode=WAL")
+			self.connection.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+			self.connection.execute("CREATE TABLE IF NOT EXISTS modelreplace (model TEXT PRIMARY KEY, skyboxModel TEXT NOT NULL)")
+		directory = os.path.dirname(os.path.abspath(self.path))
+		self.importJSON(os.path.join(directory,"config.json"),self.setSettings)
+		self.importJSON(os.path.join(directory,"modelreplace.json"),lambda user: self.setManyModelreplace(user.items()))
+
+	def importJSON(self,path,store):
+		if not os.path.exists(path):
+			return
+		with open(path,"r") as f:
+			store(json.load(f))
+		os.replace(path,path + ".imported")
+
+	#Runs statement with each of rows as a single transaction
+	def executeMany(self,statement,rows):
+		with self.lock, self.connection:
+			self.connection.executemany(statement,rows)
+
+	def getSettings(self):
+		with self.lock:
+			return {key:json.loads(val) for key, val in self.connection.execute("SELECT key, value FROM settings")}
+
+	def setSetting(self,key,val):
+		self.setSettings({key:val})
+
+	def setSettings(self,settings):
+		self.executeMany("INSERT OR REPLACE INTO settings VALUES (?, ?)",[(key,json.dumps(val)) for key, val in settings.items()])
+
+	def getModelreplace(self):
+		with self.lock:
+			return dict(self.connection.execute("SELECT model, skyboxModel FROM modelreplace"))
+
+	def setModelreplace(self,model,skyboxModel):
+		self.setManyModelreplace([(model,skyboxModel)])
+
+	def setManyModelreplace(self,pairs):
+		self.executeMany("INSERT OR REPLACE INTO modelreplace VALUES (?, ?)",pairs)
+
+	def removeModelreplace(self,model):
+		self.removeManyModelreplace([model])
+
+	def removeManyModelreplace(self,models):
+		self.executeMany("DELETE FROM modelreplace WHERE model = ?",[(model,) for model in models])
+
+	#Returns a number that changes whenever another connection (e.g. the GUI, from the daemon's point of view) commits a change to the store
+	def getVersion(self):
+		with self.lock:
+			return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+	def close(self):
+		with self.lock:
+			self.connection.close()
+
+store = None
+
+#Returns the store shared by everything in this process, opening it (and importing any JSON files) the first time it's needed
+def getStore():
+	global store
+	if store is None:
+		store = Store()
+	return store
+
+#Returns the default config dictionary, overridden with the settings held by the store. (Any settings the store doesn't hold remain default).
+def loadConfig():
+	return {**defaultConfig,"profiles":[],**getStore().getSettings()}
+
+#Returns the built-in, user (as held by the store) and full modelreplace dictionaries. Any models specified in the user modelreplace override those in the built-in one
+def loadModelreplace():
+	import builtinmodelreplace
+	builtin = dict(builtinmodelreplace.dic)
+	user = getStore().getModelreplace()
+	for model in user:
+		builtin.pop(model,None)
+	return builtin, user, {**builtin,**user}
+
+#Returns the profiles to generate, each filled out with defaultProfile's settings for any key it doesn't specify. If config specifies no profiles,
+#a single default profile writing to config's output path is used
+def getProfiles(config):
+	if len(config["profiles"]) == 0:
+		return [{**defaultProfile,"outputPath":config["outputPath"]}]
+	return [{**defaultProfile,**profile} for profile in config["profiles"]]
+
+#One stage of skybox generation. function is called with the run's options followed by the results of the stages named in inputs, and must not modify those
+#results, except for any named by consumes(options): those are handed over to the stage for it to modify as it likes (see Pipeline.evaluate). Only the options
+#named in options are passed on to function, and only they (and the inputs) decide whether a previous result can be reused. If given, isValid(result) is
+#checked before a previous result is reused
+class Stage:
+	def __init__(self,function,inputs=(),options=(),consumes=None,isValid=None):
+		self.function = function
+		self.inputs = inputs
+		self.options = options
+		self.consumes = consumes if consumes is not None else lambda options: ()
+		self.isValid = isValid if isValid is not None else lambda result: True
+
+#Lazily evaluated, memoized graph of stages. Each result is stored under a key hashed from its stage's name, the values of the options the stage reads and the
+#keys of its inputs, so a stage's key is known without running anything upstream of it, and only changes if an option or input upstream of it changes.
+#Asking for a stage therefore only runs it, and whichever stages upstream of it, whose results aren't already stored. The least recently used results are
+#dropped once more than maxResults are stored.
+#evaluate is only ever called from one thread at a time: the GUI disables Generate while a run is going, and the daemon handles one request at a time
+class Pipeline:
+	def __init__(self,stages,maxResults=32):
+		self.stages = stages
+		self.maxResults = maxResults
+		self.results = collections.OrderedDict()
+		self.scopes = {} #Key -> the values of every option its stored result depends on (see discardWhere)
+
+	def getKey(self,name,options,keys):
+		if name not in keys:
+			stage = self.stages[name]
+			parts = (name,[(option,options[option]) for option in stage.options],[self.getKey(inputName,options,keys) for inputName in stage.inputs])
+			keys[name] = hashlib.sha1(repr(parts).encode()).hexdigest()
+		return keys[name]
+
+	#Returns the names of the options the named stage reads, or that any stage upstream of it reads
+	def getScope(self,name):
+		stage = self.stages[name]
+		scope = set(stage.options)
+		for inputName in stage.inputs:
+			scope |= self.getScope(inputName)
+		return scope
+
+	#Returns the names of every stage upstream of the named stage
+	def getUpstream(self,name):
+		upstream = set()
+		for inputName in self.stages[name].inputs:
+			upstream |= {inputName} | self.getUpstream(inputName)
+		return upstream
+
+	#Returns the result of the named stage for the given options, running it (and anything upstream of it) only if need be. If take=True, the result is removed
+	#from the pipeline and belongs to the caller alone, free to be modified
+	def evaluate(self,name,options,take=False,keys=None):
+		keys = {} if keys is None else keys
+		stage = self.stages[name]
+		key = self.getKey(name,options,keys)
+		if key in self.results and stage.isValid(self.results[key]):
+			if take:
+				self.scopes.pop(key,None)
+				return self.results.pop(key)
+			self.results.move_to_end(key)
+			return self.results[key]
+		#Inputs that are only read are evaluated first, so none of them has to be rebuilt because it was just consumed by (or upstream of) another input.
+		#For the same reason, a consumed input that's upstream of another of the inputs is taken last
+		consumed = stage.consumes(options)
+		upstreamOfInputs = set().union(*[self.getUpstream(inputName) for inputName in stage.inputs])
+		inputs = {}
+		for inputName in sorted(stage.inputs,key=lambda inputName: (inputName in consumed,inputName in upstreamOfInputs)):
+			inputs[inputName] = self.evaluate(inputName,options,inputName in consumed,keys)
+		result = stage.function({option:options[option] for option in stage.options},*[inputs[inputName] for inputName in stage.inputs])
+		if not take:
+			self.results[key] = result
+			self.scopes[key] = {option:options[option] for option in self.getScope(name)}
+			while len(self.results) > self.maxResults:
+				self.scopes.pop(self.results.popitem(last=False)[0],None)
+		return result
+
+	#Drops every stored result for which predicate, given the values of the options the result depends on, returns True. E.g. generate drops the results
+	#built from older versions of its input VMF, so they aren't kept around until newer results push them out
+	def discardWhere(self,predicate):
+		for key in [key for key, scope in self.scopes.items() if predicate(scope)]:
+			del self.results[key]
+			del self.scopes[key]
+
+#Generates skyboxes from input VMFs. Doesn't depend on the GUI: if given a ui (the AutoSky application), errors, questions and completion are passed on to it;
+#otherwise the last error is kept in self.error and every question is answered with self.defaultAnswer.
+#Generation is split into the stages in self.pipeline (load, extract, resolveModels, transform, fog, bounds, room, assemble, export), whose results are kept
+#between runs, so a run only redoes the stages downstream of whichever options or files changed since the last
+class SkyboxGenerator:
+	def __init__(self,modelreplace,ui=None):
+		self.modelreplace = modelreplace
+		self.modelreplaceVersion = 0 #Increase whenever self.modelreplace is modified, so stages that used it re-run
+		self.ui = ui
+		self.error = None
+		self.report = [] #Notes about the last run, e.g. how much geometry consolidation saved
+		self.defaultAnswer = True
+		self.preserveInput = False #If True, parsed input VMFs are never moved out of, only copied from (so they can be reused for later runs)
+		self.pipeline = Pipeline({"load":Stage(self.loadStage,options=("inputPath","inputStamp")),
+									"extract":Stage(self.extractStage,("load",),("visgroup","copy","consolidate"),consumes=lambda options: () if options["copy"] else ("load",)),
+									"resolveModels":Stage(self.resolveModelsStage,("extract",),("replaceModels","modelreplaceVersion")),
+									"transform":Stage(self.transformStage,("extract","resolveModels"),("scale",),consumes=lambda options: ("extract",)),
+									"fog":Stage(self.fogStage,("load",),("copyFogSettings",)),
+									"playable":Stage(self.playableStage,("load",),("visgroup","skyboxVisgroup","scale","optimizeLightmaps")),
+									"bounds":Stage(self.boundsStage,("transform",)),
+									"room":Stage(self.roomStage,("bounds",),("minBlockUnit","wallThickness")),
+									"assemble":Stage(self.assembleStage,("fog","playable","transform","room"),("visgroup","copy","optimizeLightmaps","minLightmapScale","maxLightmapScale"),consumes=lambda options: ("room",) if options["copy"] else ("room","transform")),
+									"export":Stage(self.exportStage,("assemble",),("outputPath","useInstance","wallThickness"),consumes=lambda options: ("assemble",) if options["useInstance"] else (),isValid=self.isExportCurrent)})
+
+	#Generates one skybox per profile, all from a single parse of the input VMF. If useInstance=True (and skyboxOnly=False), each profile's output path is the skybox's own VMF,
+	#which the input VMF references through a func_instance; the input VMF is only rewritten when that func_instance doesn't exist yet, or when a skybox has
+	#grown into the one below it (see skyboxInstancesFit)
+	def generate(self,inputPath,profiles,skyboxOnly=True,replaceModels=True,copyFogSettings=True,useInstance=False,consolidate=True,optimizeLightmaps=True,debugMode=True):
+		parseError = False
+		self.report = []
+		modifiesInput = False #Whether this run changes the parsed input VMF, which then no longer matches the file (see inputModified)
+		try:
+			outputPaths = [profile["outputPath"] for profile in profiles]
+			for outputPath in outputPaths:
+				if not isVMFPath(outputPath):
+					self.finishWithError(f"Invalid output path \"{outputPath}\", or output path is not a VMF.")
+					return
+				if useInstance and not skyboxOnly and outputPath.lower().endswith(compressedExtensions):
+					self.finishWithError(f"Hammer can't load compressed instances, so the skybox's output path \"{outputPath}\" must be an uncompressed .vmf.")
+					return
+				if outputPath == inputPath:
+					self.finishWithError("Overwriting the input VMF is currently prohibited, as AutoSky is in beta. Please enter a different output path.")
+					return
+			if len(set(outputPaths)) != len(outputPaths):
+				self.finishWithError("Two or more profiles share the same output path. Please give each profile its own output path.")
+				return
+			if isVMFPath(inputPath):
+				try:
+					stat = os.stat(inputPath)
+					runOptions = {"inputPath":inputPath,
+									"inputStamp":(stat.st_mtime_ns,stat.st_size),
+									"replaceModels":replaceModels,
+									"modelreplaceVersion":self.modelreplaceVersion,
+									"copyFogSettings":copyFogSettings,
+									"consolidate":consolidate,
+									"optimizeLightmaps":optimizeLightmaps,
+									"useInstance":useInstance and not skyboxOnly}
+					self.pipeline.discardWhere(lambda scope: scope.get("inputPath") == inputPath and scope.get("inputStamp") != runOptions["inputStamp"])
+					inputVMF = self.pipeline.evaluate("load",runOptions)
+				except FileNotFoundError:
+					self.finishWithError(f"{inputPath} is not a valid filepath")
+					return
+				except Exception:
+					self.finishWithError("An error occurred parsing {}:\n\n".format(os.path.basename(inputPath)) + traceback.format_exc() + "\nIf you're sure your VMF isn't corrupt or improperly formatted, please report this issue on the AutoSky GitHub with as much information as possible!")
+					print(traceback.format_exc())
+					return
+			else:
+				self.finishWithError("Invalid input path, or input path is not a VMF.")
+				return
+
+			#Ask any questions up front, so the skyboxes themselves can be built without interruption
+			unidentifiedModels = []
+			for profile in profiles:
+				items = self.getVisgroupContents(inputVMF,profile["visgroup"])
+				if len(items) == 0:
+					yes = self.yesNoQuestion("Continue?",f"No {profile['visgroup']} visgroup was found, or if it exists it doesn't contain anything. Proceed with generating an empty skybox?")
+					if not yes:
+						self.finishWithError()
+						return
+				if replaceModels:
+					for item in items:
+						if isinstance(item,(PyVMF.PropStatic,PyVMF.PropDynamic)) and item.model not in self.modelreplace and item.model not in unidentifiedModels:
+							unidentifiedModels.append(item.model)
+			for model in unidentifiedModels:
+				yes = self.yesNoQuestion("Unidentified model",f"The model {model} was found in the AutoSky visgroup, but no replacement is specified in the model replacement index. Proceed without replacing it?")
+				if not yes:
+					self.finishWithError()
+					return
+
+			useInstance = useInstance and not skyboxOnly
+			if useInstance:
+				instances = [self.findSkyboxInstance(inputVMF,inputPath,profile) for profile in profiles]
+				rewriteInput = any(instance is None for instance in instances)
+				instanceHeights = None if rewriteInput else [getInstanceHeight(instance) for instance in instances]
+				instances = None
+
+			#Unless there's only one skybox to build and the input VMF will be thrown away afterwards, each profile works on its own copies of the visgroup's contents.
+			#The profiles are built one after another: building is pure Python, so threads wouldn't build them any faster
+			import concurrent.futures
+			copyItems = self.preserveInput or not (len(profiles) == 1 and (skyboxOnly or (useInstance and not rewriteInput)))
+			#The parsed input VMF is only changed if the visgroup's contents are moved out of it, or skyboxes or func_instances are added to it. An instance run
+			#that finds every func_instance in place leaves it (and everything built from it) as it was, to be reused by the next run
+			modifiesInput = not copyItems or (not skyboxOnly and not useInstance) or (useInstance and rewriteInput)
+			profileOptions = [{**runOptions,**profile,"copy":copyItems} for profile in profiles]
+			if not copyItems:
+				#The visgroup's contents will be moved out of the input VMF, and nothing else in it is needed afterwards, so nothing here should keep it alive
+				inputVMF = None
+				items = None
+			if skyboxOnly or useInstance:
+				exports = [self.pipeline.evaluate("export",options) for options in profileOptions]
+				allStats = [stats for path, mtime, depth, stats in exports]
+			else:
+				skyboxes = [self.pipeline.evaluate("assemble",options,True) for options in profileOptions]
+				allStats = [stats for skyboxVMF, stats in skyboxes]
+			#The report is built from the stats every stage result carries, so it's complete however many of the stages were reused from earlier runs
+			self.report = [line for profile, stats in zip(profiles,allStats) for line in describeStats(profile["visgroup"],stats)]
+
+			if not skyboxOnly and not useInstance:
+				#Merging modifies the input VMF, so it's taken out of the pipeline for good
+				inputVMF = self.pipeline.evaluate("load",runOptions,True)
+				ids = IdAllocator(inputVMF)
+				#Compressed outputs are compressed and written by writer while the next profile is merged and exported; at most one waits to be written at a time
+				with concurrent.futures.ThreadPoolExecutor(max_workers=1) as writer:
+					pending = None
+					for profile, (skyboxVMF, stats) in zip(profiles,skyboxes):
+						outputVMF = self.mergeSkybox(inputVMF,skyboxVMF,profile,ids)
+						if pending is not None:
+							pending.result()
+						pending = self.exportVMF(outputVMF,profile["outputPath"],writer)
+						#Take this profile's skybox back out, so the next profile is merged into the input VMF as it was
+						inputVMF.delete_visgroup_contents(profile["skyboxVisgroup"])
+					if pending is not None:
+						pending.result()
+
+			#Skyboxes that have grown since their func_instances were placed may now reach into the ones below them, in which case every instance is placed again.
+			#(A single profile's skybox only ever grows downward from its func_instance, so it never needs placing again)
+			if useInstance and not rewriteInput and not self.skyboxInstancesFit(instanceHeights,profiles,[depth for path, mtime, depth, stats in exports]):
+				rewriteInput = True
+				modifiesInput = True
+
+			#Only now that every skybox has been written does the input VMF get its func_instance(s), backing up the original first
+			if useInstance and rewriteInput:
+				inputVMF = self.pipeline.evaluate("load",runOptions,True)
+				self.addSkyboxInstances(inputVMF,inputPath,profiles,[depth for path, mtime, depth, stats in exports])
+				shutil.copyfile(inputPath,inputPath + ".bak")
+				self.exportVMF(inputVMF,inputPath)
+
+		except FileNotFoundError as e:
+			self.finishWithError(f"{os.path.dirname(e.filename or '')}/ is not a valid directory")
+			return
+		except:
+			self.finishWithError("An unexpected error occurred while generating the skybox:\n\n" + traceback.format_exc() + "\nPlease report this issue on the AutoSky GitHub with as much information as possible!")
+			print(traceback.format_exc())
+			return
+		finally:
+			#Also if generating failed partway through, as by then the parsed input VMF may already have been changed
+			if modifiesInput:
+				self.inputModified(inputPath)
+
+		for line in self.report:
+			print(line)
+		self.finish()
+
+	#Returns a new VMF containing the given profile's skybox, centered on the origin, built from the VMF at inputPath. options are as for generate
+	def buildSkybox(self,inputPath,profile,replaceModels=True,copyFogSettings=True,consolidate=True,optimizeLightmaps=True):
+		stat = os.stat(inputPath)
+		options = {**profile,
+					"inputPath":inputPath,
+					"inputStamp":(stat.st_mtime_ns,stat.st_size),
+					"copy":True,
+					"replaceModels":replaceModels,
+					"modelreplaceVersion":self.modelreplaceVersion,
+					"copyFogSettings":copyFogSettings,
+					"consolidate":consolidate,
+					"optimizeLightmaps":optimizeLightmaps}
+		return self.pipeline.evaluate("assemble",options,True)[0]
+
+	#Stage: parses the input VMF
+	def loadStage(self,options):
+		return self.loadVMF(options["inputPath"])
+
+	#Stage: returns the input VMF's editor build and the contents of the profile's visgroup, with duplicates dropped and adjacent brushes merged (if consolidate=True),
+	#whether they were moved rather than copied, and the stats for the run's report (see describeStats) of how much consolidating saved. If copy=False, ownership of the visgroup's contents is transferred: they're taken out of the input VMF as they
+	#are, without cloning a single side, vertex or keyvalue, so once the input VMF is dropped only the skybox's contents remain in memory
+	def extractStage(self,options,inputVMF):
+		items = inputVMF.get_all_from_visgroup(options["visgroup"],True,options["copy"])
+		if not options["copy"]:
+			detachItems(inputVMF,items)
+		stats = {}
+		if options["consolidate"]:
+			items, stats["duplicateSolids"], stats["duplicateEntities"], stats["mergedSolids"] = consolidateItems(items)
+		for item in items:
+			item.editor.remove_all_visgroups()
+			item.editor.remove_all_groups()
+			item.editor.visgroupshown = 1
+		return inputVMF.versioninfo.editorbuild, items, not options["copy"], stats
+
+	#Stage: returns which of the extracted props' models to replace, as {position in the extracted items: skybox model} (if replaceModels=True)
+	def resolveModelsStage(self,options,extracted):
+		replacements = {}
+		if options["replaceModels"]:
+			for i, item in enumerate(extracted[1]):
+				if isinstance(item,(PyVMF.PropStatic,PyVMF.PropDynamic)) and item.model in self.modelreplace: #If the prop's model is in the modelreplace dictionary
+					replacements[i] = self.modelreplace[item.model]
+		return replacements
+
+	#Stage: moves the extracted items into a new VMF, scales them by the profile's scale relative to the origin and replaces their models, and adds a sky camera
+	#at the origin. Returns the new VMF, followed by the extracted items' stats (see describeStats)
+	def transformStage(self,options,extracted,replacements):
+		editorbuild, items, moved, stats = extracted
+		outputVMF = PyVMF.new_vmf()
+		outputVMF.versioninfo.editorbuild = editorbuild
+		if moved:
+			#Moved items already have ids unique among themselves, and nothing else is in outputVMF yet, so they can go straight into its lists
+			outputVMF.world.solids.extend(item for item in items if isinstance(item,PyVMF.Solid))
+			outputVMF.entities.extend(item for item in items if not isinstance(item,PyVMF.Solid))
+		else:
+			for item in items:
+				if isinstance(item,PyVMF.Solid):
+					outputVMF.add_solids(item)
+				else:
+					outputVMF.add_entities(item)
+
+		#Replacements are found by position in the extracted items, which outputVMF lists in its own order, so they're looked up by the props themselves
+		replacements = {id(items[i]):model for i, model in replacements.items()}
+		scaler = 1/options["scale"]
+		mapOrigin = PyVMF.Vertex(0,0,0)
+		numpy = importNumpy()
+		for item in outputVMF.get_solids_and_entities(True):
+			if numpy is not None and isinstance(item,PyVMF.Solid):
+				scaleSolid(item,mapOrigin,scaler,numpy)
+				continue
+			item.scale(mapOrigin,scaler,scaler,scaler)
+			if isinstance(item,(PyVMF.PropStatic,PyVMF.PropDynamic)):
+				if id(item) in replacements:
+					item.model = replacements[id(item)] #Set that prop's model to the replacement specified in the dictionary
+				#This is the only stock skybox prop in TF2 that has a different orientation from the normal scale prop, as far as I know, so we have to rotate it. Thanks Valve
+				if item.model == "models/props_foliage/tree_pine01_4cluster_skybox.mdl":
+					item.angles += PyVMF.Vertex(0,-90,0)
+
+		#Generate sky camera at origin
+		cam = PyVMF.EntityGenerator.sky_camera(mapOrigin)
+		cam.scale = options["scale"]
+		outputVMF.add_entities(cam)
+		return outputVMF, stats
+
+	#Stage: returns the fog settings of the input VMF's first env_fog_controller as {sky_camera keyvalue: value}, or None if there isn't one (or if copyFogSettings=False)
+	def fogStage(self,options,inputVMF):
+		if not options["copyFogSettings"]:
+			return None
+		for entity in inputVMF.get_entities(True):
+			if isinstance(entity,PyVMF.EnvFogController):
+				return {key:copy.deepcopy(getattr(entity,key)) for key in fogKeys}
+		return None
+
+	#Stage: returns the (mins, maxs) bounds of the input VMF's playable region (its world brushes outside the profile's visgroup and outside any skybox
+	#previously copied into it) as they lie in the skybox, i.e. scaled by 1/scale relative to the origin, or None if there are no such brushes (or if
+	#optimizeLightmaps=False)
+	def playableStage(self,options,inputVMF):
+		if not options["optimizeLightmaps"]:
+			return None
+		skybox = {id(item) for name in (options["visgroup"],options["skyboxVisgroup"]) for item in self.getVisgroupContents(inputVMF,name)}
+		mins = [float("inf")]*3
+		maxs = [float("-inf")]*3
+		for solid in inputVMF.get_solids(False,False):
+			if id(solid) in skybox:
+				continue
+			for side in solid.side:
+				for point in getPlanePoints(side):
+					for axis in range(3):
+						mins[axis] = min(mins[axis],point[axis])
+						maxs[axis] = max(maxs[axis],point[axis])
+		if mins[0] > maxs[0]:
+			return None
+		scaler = 1/options["scale"]
+		return tuple(val*scaler for val in mins), tuple(val*scaler for val in maxs)
+
+	#Stage: returns the lower and upper x, y and z bounds of the transformed skybox
+	def boundsStage(self,options,transformed):
+		skyboxVMF, stats = transformed
+		return (skyboxVMF.getXExtremity(False),skyboxVMF.getXExtremity(True),
+				skyboxVMF.getYExtremity(False),skyboxVMF.getYExtremity(True),
+				skyboxVMF.getZExtremity(False),skyboxVMF.getZExtremity(True))
+
+	#Stage: returns the walls of the skybox room enclosing the given bounds
+	def roomStage(self,options,bounds):
+		xLowerBound, xUpperBound, yLowerBound, yUpperBound, zLowerBound, zUpperBound = bounds
+
+		#if debugMode:
+		#	print("X extremities:",xLowerBound,xUpperBound)
+		#	print("Y extremities:",yLowerBound,yUpperBound)
+		#	print("Z extremities:",zLowerBound,zUpperBound)
+
+		minBlockUnit = options["minBlockUnit"]
+		wallThickness = options["wallThickness"]
+		mapOrigin = PyVMF.Vertex(0,0,0)
+
+		numBlocksTowardXLowerBound = abs(xLowerBound // minBlockUnit) + 1
+		numBlocksTowardXUpperBound = abs(xUpperBound // minBlockUnit) + 1
+		totalXHammerUnits = (numBlocksTowardXLowerBound + numBlocksTowardXUpperBound) * minBlockUnit
+
+		numBlocksTowardYLowerBound = abs(yLowerBound // minBlockUnit) + 1
+		numBlocksTowardYUpperBound = abs(yUpperBound // minBlockUnit) + 1
+		totalYHammerUnits = (numBlocksTowardYLowerBound + numBlocksTowardYUpperBound) * minBlockUnit
+
+		numBlocksTowardZLowerBound = abs(zLowerBound // minBlockUnit) + 1
+		numBlocksTowardZUpperBound = abs(zUpperBound // minBlockUnit) + 1
+		totalZHammerUnits = (numBlocksTowardZLowerBound + numBlocksTowardZUpperBound) * minBlockUnit
+
+		room = PyVMF.SolidGenerator.room(mapOrigin,totalXHammerUnits,totalYHammerUnits,totalZHammerUnits,wallThickness)
+
+		#Determine number of x units to move to fix room's x position. Positive if needs to move upward, negative if needs to move downward
+		numBlocksToMoveX = (numBlocksTowardXUpperBound - numBlocksTowardXLowerBound) / 2
+
+		#Determine number of y units to move to fix room's x position. Positive if needs to move upward, negative if needs to move downward
+		numBlocksToMoveY = (numBlocksTowardYUpperBound - numBlocksTowardYLowerBound) / 2
+
+		#Determine number of z units to move to fix room's x position. Positive if needs to move upward, negative if needs to move downward
+		numBlocksToMoveZ = (numBlocksTowardZUpperBound - numBlocksTowardZLowerBound) / 2
+
+		for wall in room:
+			wall.set_texture("tools/toolsskybox")
+			wall.move(numBlocksToMoveX*minBlockUnit,numBlocksToMoveY*minBlockUnit,numBlocksToMoveZ*minBlockUnit)
+		return room
+
+	#Stage: returns the transformed skybox, with the input VMF's fog settings copied to its sky camera, its faces' lightmap scales chosen by optimizeLightmaps
+	#(if optimizeLightmaps=True) and its room added. The transformed skybox is copied first, unless copy=False: then it's consumed and finished in place, as
+	#nothing else will build on it once the input VMF it came from is dropped, so only one copy of the skybox is ever in memory.
+	#Returns the assembled skybox, followed by the stats for the run's report (see describeStats) of everything done to it since it was extracted
+	def assembleStage(self,options,fog,playable,transformed,room):
+		skyboxVMF, stats = transformed
+		stats = dict(stats)
+		if options["copy"]:
+			skyboxVMF = copy.deepcopy(skyboxVMF)
+		if options["optimizeLightmaps"]:
+			stats["luxels"] = optimizeLightmaps(skyboxVMF.get_solids(False,True),playable,options["minLightmapScale"],options["maxLightmapScale"])
+		stats.update(self.validateSkybox(skyboxVMF,options))
+		if fog is not None:
+			for entity in skyboxVMF.get_entities(True):
+				if entity.classname == "sky_camera":
+					for key, val in fog.items():
+						setattr(entity,key,copy.deepcopy(val))
+					break
+		skyboxVMF.add_solids(*room)
+		return skyboxVMF, stats
+
+	#Checks every solid in skyboxVMF with validateSolids, removing any world brush vbsp would reject, and returns the stats for the run's report (see describeStats)
+	#of what it found. Invalid brushes of
+	#brush entities (e.g. func_detail) are only noted, as are brushes past the map's coordinate limits, which can't be fixed by removing them (they're usually
+	#the reason the skybox is as big as it is). Skipped if NumPy isn't installed, which is only printed (to the console) rather than reported, as it's the
+	#same for every run
+	def validateSkybox(self,skyboxVMF,options):
+		numpy = importNumpy()
+		if numpy is None:
+			print(f"{options['visgroup']}: skipped checking the skybox's brushes, as NumPy isn't installed")
+			return {}
+		solids = skyboxVMF.get_solids(False,True)
+		invalid, outOfBounds = validateSolids(solids,numpy)
+		worldSolids = {id(solid) for solid in skyboxVMF.world.solids}
+		removed = {i:reason for i, reason in invalid.items() if id(solids[i]) in worldSolids}
+		flagged = {i:reason for i, reason in invalid.items() if i not in removed}
+		if len(removed) > 0:
+			removedSolids = {id(solids[i]) for i in removed}
+			skyboxVMF.world.solids = [solid for solid in skyboxVMF.world.solids if id(solid) not in removedSolids]
+		return {"removed":removed,"flagged":flagged,"outOfBounds":outOfBounds}
+
+	#Stage: writes the assembled skybox to the profile's output path, aligned for use as an instance if useInstance=True. Returns the path and the file's
+	#modification time, so the result is only reused (i.e. the file isn't rewritten) while the file is exactly as it was written, followed by how far the
+	#instance reaches below its origin (or None if useInstance=False) and the assembled skybox's stats (see describeStats)
+	def exportStage(self,options,assembled):
+		skyboxVMF, stats = assembled
+		depth = None
+		if options["useInstance"]:
+			skyboxVMF = self.alignSkyboxInstance(skyboxVMF,options)
+			depth = -skyboxVMF.getZExtremity(False)
+		self.exportVMF(skyboxVMF,options["outputPath"])
+		return options["outputPath"], os.stat(options["outputPath"]).st_mtime_ns, depth, stats
+
+	def isExportCurrent(self,result):
+		path, mtime, depth, stats = result
+		return os.path.exists(path) and os.stat(path).st_mtime_ns == mtime
+
+	#Copies the skybox built by buildSkybox into inputVMF, replacing anything in the profile's skybox visgroup, and returns inputVMF. The copied solids, sides and
+	#entities are numbered with ids reserved from ids (an IdAllocator for inputVMF)
+	def mergeSkybox(self,inputVMF,skyboxVMF,profile,ids):
+		#Clear the old skybox from input VMF (anything within the profile's skybox visgroup, "3D Skybox (AutoSky)" by default)
+		inputVMF.delete_visgroup_contents(profile["skyboxVisgroup"])
+
+		#Relocate the new skybox to the profile's offset (192 units by default) below the lowest coordinate in the input VMF (while snapping to the profile's grid)
+		gridSnap = profile["gridSnap"]
+		skyboxCurrentTopZ = skyboxVMF.getZExtremity(True) - profile["wallThickness"]
+		skyboxRelocatedTopZ = inputVMF.getZExtremity(False) - (inputVMF.getZExtremity(False) % gridSnap) - profile["offset"]
+		for item in skyboxVMF.get_solids_and_entities():
+			item.move(0,0,skyboxRelocatedTopZ-skyboxCurrentTopZ)
+
+		#Copy the new skybox over from skyboxVMF to inputVMF, and add it to the profile's skybox visgroup
+		skyboxSolids = skyboxVMF.get_solids(False,False) #TODO test getting both entities/solids at same time e.g. get_solids_and_entities
+		skyboxEntities = skyboxVMF.get_entities(False,True)
+		worldSolids = {id(solid) for solid in skyboxSolids}
+		skyboxEntitySolids = [solid for solid in skyboxVMF.get_solids(False,True) if id(solid) not in worldSolids]
+		insertItems(inputVMF,ids,skyboxSolids,skyboxEntities,skyboxEntitySolids)
+		allSkyboxElements = skyboxSolids + skyboxEntities
+		inputVMF.add_to_visgroup(profile["skyboxVisgroup"],*allSkyboxElements)
+
+		return inputVMF
+
+	#Returns the path the profile's skybox instance is referenced by from inputPath's func_instance (relative to inputPath's directory, as Hammer expects)
+	def getSkyboxInstanceFile(self,inputPath,profile):
+		try:
+			path = os.path.relpath(profile["outputPath"],os.path.dirname(os.path.abspath(inputPath)))
+		except ValueError: #On a different drive than the input VMF
+			path = os.path.abspath(profile["outputPath"])
+		return path.replace("\\","/")
+
+	#Returns the func_instance in inputVMF referencing the profile's skybox instance, or None if there isn't one
+	def findSkyboxInstance(self,inputVMF,inputPath,profile):
+		instanceFile = self.getSkyboxInstanceFile(inputPath,profile)
+		for entity in inputVMF.get_entities(True):
+			if entity.classname == "func_instance" and entity.other.get("file","").replace("\\","/") == instanceFile:
+				return entity
+		return None
+
+	#Moves the skybox built by buildSkybox so the inside of its room's ceiling sits at z=0, and returns skyboxVMF. Since the instance's origin is that ceiling,
+	#a regenerated skybox that's grown or shrunk still hangs from the same spot below the input VMF, so its func_instance only needs moving if the skybox above
+	#it (with several profiles) has grown into it
+	def alignSkyboxInstance(self,skyboxVMF,profile):
+		skyboxCurrentTopZ = skyboxVMF.getZExtremity(True) - profile["wallThickness"]
+		for item in skyboxVMF.get_solids_and_entities():
+			item.move(0,0,-skyboxCurrentTopZ)
+		return skyboxVMF
+
+	#Adds a func_instance referencing each profile's skybox instance to inputVMF, replacing anything in the profiles' skybox visgroups. depths are how far each
+	#profile's instance reaches below its origin (as returned by exportStage). The first instance is placed as in mergeSkybox, and each of the others the next
+	#profile's offset below the bottom of the one before, so no two skyboxes overlap
+	def addSkyboxInstances(self,inputVMF,inputPath,profiles,depths):
+		for skyboxVisgroup in dict.fromkeys(profile["skyboxVisgroup"] for profile in profiles):
+			inputVMF.delete_visgroup_contents(skyboxVisgroup)
+
+		#The first instance is placed below the lowest coordinate in the input VMF, and each of the others below the bottom of the one before
+		bottomZ = inputVMF.getZExtremity(False)
+		for profile, depth in zip(profiles,depths):
+			skyboxRelocatedTopZ = self.getSkyboxInstanceHeight(bottomZ,profile)
+			instance = PyVMF.Entity(dic={"classname":"func_instance",
+										"origin":f"0 0 {skyboxRelocatedTopZ}",
+										"angles":"0 0 0",
+										"fixup_style":"0",
+										"file":self.getSkyboxInstanceFile(inputPath,profile)})
+			inputVMF.add_entities(instance)
+			inputVMF.add_to_visgroup(profile["skyboxVisgroup"],instance)
+			bottomZ = skyboxRelocatedTopZ - depth
+
+	#Returns the height of the profile's instance origin (the skybox's ceiling) when placed below bottomZ: the profile's offset below it, snapped to the profile's grid
+	def getSkyboxInstanceHeight(self,bottomZ,profile):
+		return bottomZ - (bottomZ % profile["gridSnap"]) - profile["offset"]
+
+	#Returns whether the profiles' skybox instances, with their origins at heights (see getInstanceHeight) and reaching depths below them, are still placed as
+	#addSkyboxInstances requires: each at least the profile's offset below the bottom of the one before
+	def skyboxInstancesFit(self,heights,profiles,depths):
+		for i in range(1,len(profiles)):
+			if heights[i] > self.getSkyboxInstanceHeight(heights[i-1] - depths[i-1],profiles[i]):
+				return False
+		return True
+
+	#Parses the VMF at path, which may be compressed (see wrapCompressed). Overridden by the daemon to reuse recently parsed VMFs
+	def loadVMF(self,path):
+		if not path.lower().endswith(compressedExtensions):
+			return PyVMF.load_vmf(path)
+		#PyVMF only parses files, so the VMF is decompressed to a temporary file as a stream (see pipeFile), never as a whole in memory
+		with tempfile.TemporaryDirectory() as directory:
+			p = os.path.join(directory,"input.vmf")
+			pipeFile(path,p)
+			return PyVMF.load_vmf(p)
+
+	#Writes vmf to path, compressing it if path is a compressed VMF path (see wrapCompressed). PyVMF only exports to files, so a compressed VMF is exported
+	#to a temporary file first, and then compressed into place by pipeFile. If writer (an executor) is given, only the export happens here; the compressing
+	#is submitted to writer, so it overlaps with whatever the caller does next, and the returned future finishes once it's done
+	def exportVMF(self,vmf,path,writer=None):
+		if not path.lower().endswith(compressedExtensions):
+			vmf.export(path)
+			return None
+		directory = tempfile.mkdtemp()
+		try:
+			p = os.path.join(directory,"output.vmf")
+			vmf.export(p)
+		except:
+			shutil.rmtree(directory,ignore_errors=True)
+			raise
+
+		def compress():
+			try:
+				pipeFile(p,path)
+			finally:
+				shutil.rmtree(directory,ignore_errors=True)
+		if writer is None:
+			compress()
+			return None
+		return writer.submit(compress)
+
+	#Returns the (uncopied) contents of the named visgroup in vmf
+	def getVisgroupContents(self,vmf,name):
+		return vmf.get_all_from_visgroup(name,True,False)
+
+	#Called once generate has modified the parsed input VMF at path, which then no longer matches the file
+	def inputModified(self,path):
+		self.pipeline.discardWhere(lambda scope: scope.get("inputPath") == path)
+
+	def finish(self):
+		self.error = None
+		if self.ui is not None:
+			self.ui.finish(self.report)
+
+	def finishWithError(self,message=None):
+		self.error = message if message is not None else "Cancelled"
+		if self.ui is not None:
+			self.ui.finishWithError(message)
+
+	def yesNoQuestion(self,title,message):
+		if self.ui is not None:
+			return self.ui.yesNoQuestion(title,message)
+		return self.defaultAnswer
+
+#Returns the height (z) of a func_instance's origin, whether PyVMF holds it as a vertex or as its raw "x y z" keyvalue
+def getInstanceHeight(instance):
+	origin = getattr(instance,"origin",None)
+	if origin is None:
+		origin = instance.other.get("origin","0 0 0")
+	if isinstance(origin,str):
+		return float(origin.split()[2])
+	return origin.z
+
+#The keyvalues copied from the input VMF's env_fog_controller to the skybox's sky_camera
+fogKeys = ("fogcolor","fogcolor2","fogdir","fogend","fogmaxdensity","fogstart","fogblend","fogenable","use_angles")
+
+#Returns side's plane as three (x, y, z) tuples
+def getPlanePoints(side):
+	return [(point.x,point.y,point.z) for point in side.plane]
+
+#Returns side's plane as a rounded (normal x, normal y, normal z, distance) tuple, which is the same however the plane's three points were chosen
+def getPlaneKey(side):
+	(ax,ay,az), (bx,by,bz), (cx,cy,cz) = getPlanePoints(side)
+	ux, uy, uz = bx-ax, by-ay, bz-az
+	vx, vy, vz = cx-ax, cy-ay, cz-az
+	nx, ny, nz = uy*vz-uz*vy, uz*vx-ux*vz, ux*vy-uy*vx
+	length = (nx*nx + ny*ny + nz*nz) ** 0.5
+	if length == 0:
+		return None
+	nx, ny, nz = nx/length, ny/length, nz/length
+	return (round(nx,4),round(ny,4),round(nz,4),round(nx*ax + ny*ay + nz*az,2))
+
+#Returns a hashable key identifying solid's geometry and textures; two solids with the same key are exact duplicates. Displaced solids (whose geometry
+#also depends on their dispinfo) return None and are never considered duplicates
+def getSolidKey(solid):
+	sides = []
+	for side in solid.side:
+		if side.dispinfo is not None:
+			return None
+		sides.append((getPlaneKey(side),side.material.lower(),str(side.uaxis),str(side.vaxis)))
+	return frozenset(sides)
+
+#Returns a hashable key of prop's keyvalues (other than its id and editor settings); two props with the same key are exact duplicates
+def getPropKey(prop):
+	return tuple(sorted((key,str(val)) for key, val in vars(prop).items() if key not in ("id","editor")))
+
+#If solid is an axis-aligned box, returns (mins, maxs, faces), where faces maps each direction ("-x", "+y", ...) to that face's side; else returns None
+def getBox(solid):
+	if len(solid.side) != 6:
+		return None
+	if any(side.dispinfo is not None for side in solid.side):
+		return None
+	planes = [getPlanePoints(side) for side in solid.side]
+	points = [point for planePoints in planes for point in planePoints]
+	mins = tuple(min(point[axis] for point in points) for axis in range(3))
+	maxs = tuple(max(point[axis] for point in points) for axis in range(3))
+	faces = {}
+	for side, planePoints in zip(solid.side,planes):
+		for axis, name in enumerate("xyz"):
+			if all(point[axis] == mins[axis] for point in planePoints):
+				faces["-" + name] = side
+			elif all(point[axis] == maxs[axis] for point in planePoints):
+				faces["+" + name] = side
+	if len(faces) != 6:
+		return None
+	return mins, maxs, faces
+
+#Returns the parts of a face that have to match for two box faces to be merged into one without any visible change
+def getFaceKey(side):
+	return (side.material.lower(),str(side.uaxis),str(side.vaxis),str(side.lightmapscale))
+
+#Greedily merges pairs of axis-aligned boxes that share an entire face into single boxes, for as long as any such pairs remain. A pair is only merged if the
+#merged box's faces would keep the same textures and texture alignment; the first box is stretched over the second, which is dropped. Returns the merged-away solids
+def mergeBoxes(solids):
+	boxes = {}
+	for solid in solids:
+		box = getBox(solid)
+		if box is not None:
+			boxes[solid] = box
+	merged = []
+	for axis, name in enumerate("xyz"):
+		lateral = [f"{sign}{other}" for other in "xyz" if other != name for sign in "+-"]
+		changed = True
+		while changed:
+			changed = False
+			#Index boxes by the face they'd share with a neighbour: the +axis face's plane and extent for the lower box, the -axis face's for the upper one
+			byUpperFace = {}
+			for solid, (mins, maxs, faces) in boxes.items():
+				extent = tuple(value for i, value in enumerate(mins + maxs) if i % 3 != axis)
+				byUpperFace[(maxs[axis],extent)] = solid
+			for solid in list(boxes):
+				if solid not in boxes:
+					continue
+				mins, maxs, faces = boxes[solid]
+				extent = tuple(value for i, value in enumerate(mins + maxs) if i % 3 != axis)
+				lower = byUpperFace.get((mins[axis],extent))
+				if lower is None or lower is solid or lower not in boxes:
+					continue
+				lowerMins, lowerMaxs, lowerFaces = boxes[lower]
+				if any(getFaceKey(lowerFaces[face]) != getFaceKey(faces[face]) for face in lateral + ["+" + name]):
+					continue
+				#Stretch the lower box up to the top of this one, and drop this one
+				for side in lower.side:
+					for point in side.plane:
+						if [point.x,point.y,point.z][axis] == lowerMaxs[axis]:
+							setattr(point,name,maxs[axis])
+				newMaxs = tuple(maxs[i] if i == axis else lowerMaxs[i] for i in range(3))
+				boxes[lower] = (lowerMins,newMaxs,lowerFaces)
+				del boxes[solid]
+				byUpperFace.pop((lowerMaxs[axis],extent),None)
+				byUpperFace[(maxs[axis],extent)] = lower
+				merged.append(solid)
+				changed = True
+	return merged
+
+#Takes items (as returned by get_all_from_visgroup without copying) out of vmf's world solids and entities, so vmf no longer references them
+def detachItems(vmf,items):
+	ids = {id(item) for item in items}
+	vmf.world.solids = [solid for solid in vmf.world.solids if id(solid) not in ids]
+	vmf.entities = [entity for entity in vmf.entities if id(entity) not in ids]
+
+#Hands out ids that don't clash with any already used in a VMF: solids and entities share one id space and sides have their own, as in Hammer. The VMF is
+#scanned once when the allocator is made; after that, reserve hands out a whole range of ids at a time, however big the VMF is
+class IdAllocator:
+	def __init__(self,vmf):
+		solids = vmf.get_solids(True,True)
+		self.nextId = max([1] + [int(solid.id) for solid in solids] + [int(entity.id) for entity in vmf.get_entities(True,True)]) + 1
+		self.nextSideId = max([0] + [int(side.id) for solid in solids for side in solid.side]) + 1
+
+	#Reserves count contiguous solid/entity ids and sideCount contiguous side ids, and returns the first of each
+	def reserve(self,count,sideCount=0):
+		first, firstSide = self.nextId, self.nextSideId
+		self.nextId += count
+		self.nextSideId += sideCount
+		return first, firstSide
+
+#Adds solids (to the world) and entities to vmf in bulk, numbering them, their sides and entitySolids (the solids of any brush entities among entities)
+#from ranges reserved from ids (an IdAllocator for vmf). Unlike vmf.add_solids/add_entities, nothing is looked up in vmf per item
+def insertItems(vmf,ids,solids,entities,entitySolids=()):
+	numbered = list(solids) + list(entitySolids)
+	nextId, nextSideId = ids.reserve(len(numbered) + len(entities),sum(len(solid.side) for solid in numbered))
+	for solid in numbered:
+		solid.id = nextId
+		nextId += 1
+		for side in solid.side:
+			side.id = nextSideId
+			nextSideId += 1
+	for entity in entities:
+		entity.id = nextId
+		nextId += 1
+	vmf.world.solids.extend(solids)
+	vmf.entities.extend(entities)
+
+#Drops exact duplicate solids and props from items, then merges adjacent brushes (see mergeBoxes). Returns the remaining items, followed by how many
+#duplicate solids and entities were dropped and how many solids were merged away
+def consolidateItems(items):
+	seen = set()
+	kept = []
+	duplicateSolids = 0
+	duplicateEntities = 0
+	for item in items:
+		if isinstance(item,PyVMF.Solid):
+			key = getSolidKey(item)
+		elif isinstance(item,(PyVMF.PropStatic,PyVMF.PropDynamic)):
+			key = getPropKey(item)
+		else:
+			key = None
+		if key is not None:
+			key = (type(item).__name__,key)
+			if key in seen:
+				if isinstance(item,PyVMF.Solid):
+					duplicateSolids += 1
+				else:
+					duplicateEntities += 1
+				continue
+			seen.add(key)
+		kept.append(item)
+	merged = set(mergeBoxes([item for item in kept if isinstance(item,PyVMF.Solid)]))
+	kept = [item for item in kept if item not in merged]
+	return kept, duplicateSolids, duplicateEntities, len(merged)
+
+def subtract(u,v):
+	return (u[0]-v[0],u[1]-v[1],u[2]-v[2])
+
+def dot(u,v):
+	return u[0]*v[0] + u[1]*v[1] + u[2]*v[2]
+
+def cross(u,v):
+	return (u[1]*v[2]-u[2]*v[1],u[2]*v[0]-u[0]*v[2],u[0]*v[1]-u[1]*v[0])
+
+#Returns the polygon (as a list of (x, y, z) points) each of solid's sides makes up, in the same order as solid.side: each side's plane, cut down to the part
+#that's behind all of the solid's other planes. A side that doesn't make up any of the solid's surface gets an empty polygon
+def getFacePolygons(solid):
+	planes = [getPlanePoints(side) for side in solid.side]
+	allPoints = [point for planePoints in planes for point in planePoints]
+	interior = tuple(sum(point[axis] for point in allPoints)/len(allPoints) for axis in range(3))
+	#Each plane as (point on it, normal pointing out of the solid), whichever way round its three points were given
+	outward = []
+	for a, b, c in planes:
+		normal = cross(subtract(b,a),subtract(c,a))
+		if dot(subtract(interior,a),normal) > 0:
+			normal = (-normal[0],-normal[1],-normal[2])
+		outward.append((a,normal))
+
+	polygons = []
+	for i, (a, normal) in enumerate(outward):
+		length = dot(normal,normal) ** 0.5
+		if length == 0:
+			polygons.append([])
+			continue
+		#Start from a square on the plane far bigger than any map, and clip it by every other plane in turn
+		axis = min(range(3),key=lambda axis: abs(normal[axis]))
+		u = cross(normal,tuple(1 if j == axis else 0 for j in range(3)))
+		v = cross(normal,u)
+		uLength, vLength = dot(u,u) ** 0.5, dot(v,v) ** 0.5
+		size = 1 << 17
+		polygon = [tuple(a[j] + su*size*u[j]/uLength + sv*size*v[j]/vLength for j in range(3)) for su, sv in ((-1,-1),(1,-1),(1,1),(-1,1))]
+		for j, (b, otherNormal) in enumerate(outward):
+			if j == i or len(polygon) == 0:
+				continue
+			clipped = []
+			distances = [dot(subtract(point,b),otherNormal) for point in polygon]
+			for k, point in enumerate(polygon):
+				nextPoint, distance, nextDistance = polygon[(k+1) % len(polygon)], distances[k], distances[(k+1) % len(polygon)]
+				if distance <= 0:
+					clipped.append(point)
+				if (distance < 0) != (nextDistance < 0) and distance != nextDistance:
+					t = distance/(distance - nextDistance)
+					clipped.append(tuple(point[m] + t*(nextPoint[m] - point[m]) for m in range(3)))
+			polygon = clipped
+		polygons.append(polygon)
+	return polygons
+
+#Returns the area and centre of each of solid's sides, in the same order as solid.side
+def getFaceAreas(solid):
+	box = getBox(solid)
+	if box is not None:
+		mins, maxs, faces = box
+		directions = {id(side):direction for direction, side in faces.items()}
+		result = []
+		for side in solid.side:
+			direction = directions[id(side)]
+			axis = "xyz".index(direction[1])
+			extents = [maxs[j] - mins[j] for j in range(3) if j != axis]
+			centre = [(mins[j] + maxs[j])/2 for j in range(3)]
+			centre[axis] = mins[axis] if direction[0] == "-" else maxs[axis]
+			result.append((extents[0]*extents[1],tuple(centre)))
+		return result
+	result = []
+	for polygon in getFacePolygons(solid):
+		if len(polygon) < 3:
+			result.append((0,None))
+			continue
+		total = (0,0,0)
+		for k in range(1,len(polygon) - 1):
+			total = tuple(sum(pair) for pair in zip(total,cross(subtract(polygon[k],polygon[0]),subtract(polygon[k+1],polygon[0]))))
+		centre = tuple(sum(point[j] for point in polygon)/len(polygon) for j in range(3))
+		result.append((dot(total,total) ** 0.5 / 2,centre))
+	return result
+
+#Returns the distance from point to the nearest point within the (mins, maxs) bounds
+def getBoundsDistance(point,bounds):
+	mins, maxs = bounds
+	return sum(max(mins[axis] - point[axis],0,point[axis] - maxs[axis]) ** 2 for axis in range(3)) ** 0.5
+
+#A face this far (in skybox units) from the playable region is given the default lightmap scale of 16, one twice as far 32, and so on. Since distances within
+#the skybox and the skybox's faces are scaled alike, each face's lightmap then looks about as detailed in game whatever the profile's scale
+lightmapDistance = 512
+
+#Faces more than this many luxels across are given a coarser lightmap scale (vbsp would otherwise have to split them up)
+maxLuxelsAcross = 32
+
+#Returns roughly how many luxels vrad lights on a face of the given area at the given lightmap scale
+def getLuxelCount(area,lightmapScale):
+	return max(1,math.ceil(area/(lightmapScale*lightmapScale)))
+
+#Chooses the lightmap scale of each of solids' lightmapped faces from its area and its distance from playable (the bounds of the playable region as returned
+#by playableStage, or None to go by area alone), as the next power of two from minScale up to maxScale. A face is never given a finer lightmap scale than it
+#already has. Returns how many luxels the faces had before and have after
+def optimizeLightmaps(solids,playable,minScale,maxScale):
+	before = 0
+	after = 0
+	for solid in solids:
+		for side, (area, centre) in zip(solid.side,getFaceAreas(solid)):
+			if centre is None or side.material.lower().startswith("tools/"):
+				continue
+			current = float(side.lightmapscale)
+			distance = 0 if playable is None else getBoundsDistance(centre,playable)
+			target = max(16*distance/lightmapDistance,area ** 0.5 / maxLuxelsAcross,1)
+			target = min(maxScale,max(minScale,2 ** math.ceil(math.log2(target))))
+			if target > current:
+				side.lightmapscale = int(target)
+			before += getLuxelCount(area,current)
+			after += getLuxelCount(area,max(current,target))
+	return before, after
+
+#Largest coordinate vbsp accepts along any axis
+maxCoord = 16384
+
+#Brushes thinner than this (in any of their faces' directions) are rejected by validateSolids
+minBrushThickness = 0.25
+
+#How far a plane point may lie outside one of its solid's other planes before the solid counts as not convex
+planeTolerance = 0.01
+
+#Checks all of solids at once (as NumPy arrays of their sides' plane points) for what vbsp rejects: faces whose plane points don't define a plane, solids that
+#aren't convex (a plane point lies outside another of the solid's planes) and solids thinner than minBrushThickness. Returns {position in solids: reason} for
+#the invalid solids, and how many solids (valid or not) have points beyond maxCoord
+def validateSolids(solids,numpy):
+	if len(solids) == 0:
+		return {}, 0
+	#Solids with fewer sides than the most any solid has are padded out with copies of their first side, which doesn't change anything checked below
+	sideCount = max(len(solid.side) for solid in solids)
+	points = numpy.empty((len(solids),sideCount,3,3))
+	for i, solid in enumerate(solids):
+		planes = [getPlanePoints(side) for side in solid.side]
+		points[i] = planes + [planes[0]]*(sideCount - len(planes))
+	a, b, c = points[:,:,0], points[:,:,1], points[:,:,2]
+
+	#A plane is degenerate if its three points are (nearly) in a line
+	normals = numpy.cross(b - a,c - a)
+	lengths = numpy.linalg.norm(normals,axis=2)
+	spans = numpy.linalg.norm(b - a,axis=2)*numpy.linalg.norm(c - a,axis=2)
+	degenerate = lengths <= 1e-6*spans
+	normals = numpy.where(degenerate[:,:,None],0,normals/numpy.where(degenerate,1,lengths)[:,:,None])
+
+	#Point each normal out of its solid, as judged from the average of the solid's plane points, which lies inside it if the solid is convex
+	allPoints = points.reshape(len(solids),sideCount*3,3)
+	interior = allPoints.mean(axis=1)
+	inward = numpy.einsum("nmk,nmk->nm",interior[:,None] - a,normals) > 0
+	normals = numpy.where(inward[:,:,None],-normals,normals)
+	distances = numpy.einsum("nmk,nmk->nm",a,normals)
+
+	#projections[n, p, q] is how far along solid n's plane q its plane point p lies
+	projections = numpy.einsum("npk,nqk->npq",allPoints,normals)
+	nonConvex = (projections - distances[:,None,:] > planeTolerance).any(axis=(1,2))
+	thickness = numpy.where(degenerate,numpy.inf,projections.max(axis=1) - projections.min(axis=1)).min(axis=1)
+	thin = thickness < minBrushThickness
+	outOfBounds = numpy.abs(allPoints).max(axis=(1,2)) > maxCoord
+
+	invalid = {}
+	for reasons, reason in ((thin,"thinner than {} units".format(minBrushThickness)),(nonConvex,"not convex"),(degenerate.any(axis=1),"with degenerate faces")):
+		for i in numpy.flatnonzero(reasons):
+			invalid[int(i)] = reason
+	return invalid, int(outOfBounds.sum())
+
+#Returns a summary of the reasons in invalid (as returned by validateSolids), e.g. "2 not convex, 1 with degenerate faces"
+def describeReasons(invalid):
+	return ", ".join(f"{count} {reason}" for reason, count in collections.Counter(invalid.values()).items())
+
+#Returns the lines of the run's report describing stats, the numbers carried by the stage results of the given visgroup's skybox: how many duplicate solids and
+#entities consolidating removed and how many solids it merged away (see consolidateItems), the face luxels before and after optimizing lightmaps (see
+#optimizeLightmaps), and the solids validating removed or flagged and how many are out of bounds (see validateSkybox)
+def describeStats(visgroup,stats):
+	lines = []
+	duplicateSolids, duplicateEntities, mergedSolids = stats.get("duplicateSolids",0), stats.get("duplicateEntities",0), stats.get("mergedSolids",0)
+	if duplicateSolids + duplicateEntities + mergedSolids > 0:
+		lines.append(f"{visgroup}: removed {duplicateSolids} duplicate brush(es) and {duplicateEntities} duplicate entity/entities, and merged {mergedSolids} brush(es) into their neighbours")
+	if "luxels" in stats:
+		before, after = stats["luxels"]
+		if after < before:
+			lines.append(f"{visgroup}: coarsened lightmaps from {before} to {after} luxels ({100 - 100*after//before}% fewer)")
+	removed, flagged = stats.get("removed",{}), stats.get("flagged",{})
+	if len(removed) > 0:
+		lines.append(f"{visgroup}: removed {len(removed)} brush(es) vbsp would reject ({describeReasons(removed)})")
+	if len(flagged) > 0:
+		lines.append(f"{visgroup}: {len(flagged)} brush entity brush(es) would be rejected by vbsp and need fixing by hand ({describeReasons(flagged)})")
+	if stats.get("outOfBounds",0) > 0:
+		lines.append(f"{visgroup}: {stats['outOfBounds']} brush(es) extend past the map's coordinate limits (±{maxCoord} units) and may stop the map compiling")
+	return lines
+
+#Returns the rows ("row0", "row1", ...) of one of dispinfo's row blocks (e.g. "distances"), each in whichever form PyVMF parsed it as: a string of
+#space-separated numbers, or a list of numbers, vertices or nested lists of either
+def getDispRows(dispinfo,name):
+	block = getattr(dispinfo,name)
+	rows = []
+	i = 0
+	while hasattr(block,f"row{i}"):
+		rows.append(getattr(block,f"row{i}"))
+		i += 1
+	return rows
+
+#Replaces the numbers in one of dispinfo's row blocks with values, in order, keeping each row in the form it was parsed as (see refillRow)
+def setDispRows(dispinfo,name,values):
+	block = getattr(dispinfo,name)
+	values = iter(values)
+	for i, row in enumerate(getDispRows(dispinfo,name)):
+		setattr(block,f"row{i}",refillRow(row,values))
+
+#Yields the numbers in row (as returned by getDispRows), in order
+def flattenRow(row):
+	if isinstance(row,str):
+		yield from (float(val) for val in row.split())
+		return
+	for val in row:
+		if isinstance(val,(list,tuple)):
+			yield from flattenRow(val)
+		elif hasattr(val,"x"): #Vertex
+			yield from (val.x,val.y,val.z)
+		else:
+			yield val
+
+#Returns row (as returned by getDispRows) in the same form, with its numbers replaced by the next ones from the iterator values. Vertices are updated in place
+def refillRow(row,values):
+	if isinstance(row,str):
+		return " ".join(formatNumber(next(values)) for val in row.split())
+	refilled = []
+	for val in row:
+		if isinstance(val,(list,tuple)):
+			refilled.append(type(val)(refillRow(val,values)))
+		elif hasattr(val,"x"): #Vertex
+			val.x, val.y, val.z = next(values), next(values), next(values)
+			refilled.append(val)
+		else:
+			refilled.append(next(values))
+	return refilled
+
+#Formats the number val as short as it can be written while still reading back as exactly the same float, without a trailing ".0" (as Hammer writes whole numbers)
+def formatNumber(val):
+	text = repr(float(val))
+	return text[:-2] if text.endswith(".0") else text
+
+#A displaced side's dispinfo, with the rows that scaling changes parsed into NumPy arrays shaped by its power: distances into (n, n) and offsets into (n, n, 3),
+#where n = 2^power + 1. Normals, offset normals, alphas and triangle tags are unaffected by uniform scaling (and moving), so they're never parsed at all.
+#The arrays are only turned back into rows by writeRows
+class Displacement:
+	def __init__(self,dispinfo,numpy):
+		self.dispinfo = dispinfo
+		self.numpy = numpy
+		self.size = 2 ** int(dispinfo.power) + 1
+		self.distances = self.parseRows("distances").reshape(self.size,self.size)
+		self.offsets = self.parseRows("offsets").reshape(self.size,self.size,3)
+
+	def parseRows(self,name):
+		rows = getDispRows(self.dispinfo,name)
+		if all(isinstance(row,str) for row in rows):
+			return self.numpy.fromstring(" ".join(rows),sep=" ")
+		return self.numpy.array([val for row in rows for val in flattenRow(row)],dtype=float)
+
+	#Scales the displacement uniformly by factor relative to origin. Its start position is scaled as a point, and its distances, offsets and elevation as lengths
+	def scale(self,origin,factor):
+		startposition = self.dispinfo.startposition
+		startposition.x = origin.x + (startposition.x - origin.x) * factor
+		startposition.y = origin.y + (startposition.y - origin.y) * factor
+		startposition.z = origin.z + (startposition.z - origin.z) * factor
+		self.dispinfo.elevation = float(self.dispinfo.elevation) * factor
+		self.distances *= factor
+		self.offsets *= factor
+
+	def writeRows(self):
+		setDispRows(self.dispinfo,"distances",self.distances.ravel().tolist())
+		setDispRows(self.dispinfo,"offsets",self.offsets.ravel().tolist())
+
+#Scales solid uniformly by factor relative to origin. Its displacements are detached while PyVMF scales the brush itself, so rather than PyVMF reworking every
+#row of every displaced side, they're scaled as whole arrays (see Displacement) and written back once
+def scaleSolid(solid,origin,factor,numpy):
+	displaced = [side for side in solid.side if side.dispinfo is not None]
+	dispinfos = [side.dispinfo for side in displaced]
+	for side in displaced:
+		side.dispinfo = None
+	solid.scale(origin,factor,factor,factor)
+	for side, dispinfo in zip(displaced,dispinfos):
+		side.dispinfo = dispinfo
+		displacement = Displacement(dispinfo,numpy)
+		displacement.scale(origin,factor)
+		displacement.writeRows()
+
+#Sorted, searchable view over the merged model replacement index (built-in + user). Models are kept sorted by their lowercase name so prefix matches are a bisect away,
+#and substring searches are narrowed incrementally from the previous query's results whenever the new query contains the old one (i.e. while the user is typing)
+class ModelReplaceIndex:
+	def __init__(self,builtinmodelreplace,usermodelreplace):
+		self.builtinmodelreplace = builtinmodelreplace
+		self.usermodelreplace = usermodelreplace
+		self.rebuild()
+
+	def rebuild(self):
+		self.models = sorted({**self.builtinmodelreplace,**self.usermodelreplace},key=str.lower)
+		self.lowerModels = [model.lower() for model in self.models]
+		self.haystacks = [self.lowerModels[i] + "\t" + self.getSkyboxModel(model).lower() for i, model in enumerate(self.models)]
+		self.lastQuery = None
+		self.lastResult = None
+
+	def __len__(self):
+		return len(self.models)
+
+	def getSkyboxModel(self,model):
+		if model in self.usermodelreplace:
+			return self.usermodelreplace[model]
+		return self.builtinmodelreplace[model]
+
+	def isCustom(self,model):
+		return model in self.usermodelreplace
+
+	#Position of model in self.models, or of where it would be inserted if it isn't indexed
+	def find(self,model):
+		lower = model.lower()
+		i = bisect.bisect_left(self.lowerModels,lower)
+		while i < len(self.models) and self.lowerModels[i] == lower and self.models[i] != model: #Skip past models differing only in case
+			i += 1
+		return i
+
+	def add(self,model):
+		i = self.find(model)
+		if i < len(self.models) and self.models[i] == model: #Already indexed, so only its skybox model changed
+			self.haystacks[i] = self.lowerModels[i] + "\t" + self.getSkyboxModel(model).lower()
+		else:
+			self.models.insert(i,model)
+			self.lowerModels.insert(i,model.lower())
+			self.haystacks.insert(i,model.lower() + "\t" + self.getSkyboxModel(model).lower())
+		self.lastQuery = None
+		self.lastResult = None
+
+	def remove(self,*models):
+		if len(models) > 1: #Cheaper to rebuild once than to shift the lists for every model
+			self.rebuild()
+			return
+		for model in models:
+			i = self.find(model)
+			if i < len(self.models) and self.models[i] == model:
+				del self.models[i]
+				del self.lowerModels[i]
+				del self.haystacks[i]
+		self.lastQuery = None
+		self.lastResult = None
+
+	#Returns the positions (in self.models) of all entries whose model or skybox model contains query, with models starting with query listed first
+	def search(self,query):
+		query = query.lower()
+		if query == "":
+			return range(len(self.models))
+		if self.lastQuery is not None and query == self.lastQuery:
+			return self.lastResult
+		if self.lastQuery and self.lastQuery in query: #The previous results are a superset of this query's results, so only they need to be scanned
+			candidates = self.lastResult
+		else:
+			candidates = range(len(self.models))
+		lo = bisect.bisect_left(self.lowerModels,query)
+		hi = bisect.bisect_left(self.lowerModels,query + "\uffff")
+		haystacks = self.haystacks
+		result = list(range(lo,hi)) + [i for i in candidates if (i < lo or i >= hi) and query in haystacks[i]]
+		self.lastQuery = query
+		self.lastResult = result
+		return result
+
+#Reads a model replacement mapping file, either a JSON object of {model: skybox model} (the same format as modelreplace.json) or a two-column CSV of model, skybox model rows.
+#Returns a list of (model, skybox model) pairs
+def readModelreplaceFile(path):
+	if path.lower().endswith(".json"):
+		with open(path,"r") as f:
+			data = json.load(f)
+		if isinstance(data,dict):
+			return list(data.items())
+		return [(row[0],row[1]) for row in data]
+	pairs = []
+	with open(path,"r",newline="") as f:
+		for row in csv.reader(f):
+			if len(row) < 2 or row[0].strip() == "" or row[1].strip() == "":
+				continue
+			if len(pairs) == 0 and not row[0].strip().lower().endswith(".mdl"): #Header row
+				continue
+			pairs.append((row[0].strip(),row[1].strip()))
+	return pairs
+
+#Writes (model, skybox model) pairs to a mapping file readable by readModelreplaceFile, in JSON or CSV format depending on the file extension
+def writeModelreplaceFile(path,pairs):
+	if path.lower().endswith(".json"):
+		with open(path,"w") as f:
+			json.dump(dict(pairs),f,indent=4)
+		return
+	with open(path,"w",newline="") as f:
+		writer = csv.writer(f)
+		writer.writerow(("model","skybox model"))
+		writer.writerows(pairs)
+
+#Returns how long, in milliseconds, a fresh interpreter takes to import this module (as reported by python -X importtime, so interpreter startup isn't counted).
+#The module's bytecode is cached first, so an edited source (or PYTHONDONTWRITEBYTECODE) doesn't add the time taken to compile it
+def measureImportTime():
+	import subprocess
+	import py_compile
+	try:
+		py_compile.compile(os.path.realpath(__file__),doraise=True)
+	except (OSError,py_compile.PyCompileError):
+		pass
+	result = subprocess.run([sys.executable,"-X","importtime","-c","import autoskycore"],cwd=os.path.dirname(os.path.realpath(__file__)),capture_output=True,text=True,check=True)
+	for line in result.stderr.splitlines():
+		fields = line.split("|")
+		if len(fields) == 3 and fields[2].strip() == "autoskycore":
+			return int(fields[1]) / 1000
+	raise RuntimeError("autoskycore wasn't imported:\n" + result.stderr)
+
+if __name__ == "__main__":
+	#Take the best of a few runs, so a busy machine doesn't fail the check
+	importTime = min(measureImportTime() for i in range(5))
+	print("Importing autoskycore took {:.1f} ms (budget: {} ms)".format(importTime,startupBudget))
+	sys.exit(0 if importTime <= startupBudget else 1)
@@ -0,0 +1,102 @@
+import gzip
+import os.path
+import tempfile
+import unittest
+
+import autoskycore
+
+#Writes data to (or reads it from) path through wrapCompressed, as pipeFile does
+def writeCompressed(path,data):
+	with open(path,"wb") as f:
+		with autoskycore.wrapCompressed(f,path,"wb") as stream:
+			stream.write(data)
+
+def readCompressed(path):
+	with open(path,"rb") as f:
+		with autoskycore.wrapCompressed(f,path,"rb") as stream:
+			return stream.read()
+
+class WrapCompressedTest(unittest.TestCase):
+	def testRoundTrip(self):
+		data = b"versioninfo\n{\n\t\"editorversion\" \"400\"\n}\n" * 1000
+		extensions = [".vmf",".vmf.gz"]
+		try:
+			import zstandard
+			extensions.append(".vmf.zst")
+		except ImportError:
+			pass
+		with tempfile.TemporaryDirectory() as directory:
+			for extension in extensions:
+				path = os.path.join(directory,"map" + extension)
+				writeCompressed(path,data)
+				self.assertEqual(readCompressed(path),data)
+
+	def testGzipIsReadableByGzip(self):
+		with tempfile.TemporaryDirectory() as directory:
+			path = os.path.join(directory,"map.vmf.gz")
+			writeCompressed(path,b"world\n{\n}\n")
+			self.assertEqual(gzip.decompress(open(path,"rb").read()),b"world\n{\n}\n")
+
+	def testIsVMFPath(self):
+		self.assertTrue(autoskycore.isVMFPath("C:/maps/Map.VMF"))
+		self.assertTrue(autoskycore.isVMFPath("map.vmf.gz"))
+		self.assertTrue(autoskycore.isVMFPath("map.vmf.zst"))
+		self.assertFalse(autoskycore.isVMFPath("map.bsp"))
+		self.assertFalse(autoskycore.isVMFPath("map.gz"))
+
+class PipeFileTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		#Several chunks' worth, so the threads have to hand chunks along rather than pass everything at once
+		self.data = bytes(range(256)) * (autoskycore.chunkSize * 3 // 256 + 7)
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def path(self,name):
+		return os.path.join(self.directory.name,name)
+
+	def write(self,name,data):
+		writeCompressed(self.path(name),data)
+
+	def read(self,name):
+		return readCompressed(self.path(name))
+
+	def testPlainCopy(self):
+		self.write("map.vmf",self.data)
+		autoskycore.pipeFile(self.path("map.vmf"),self.path("copy.vmf"))
+		self.assertEqual(self.read("copy.vmf"),self.data)
+
+	def testCompressAndDecompress(self):
+		self.write("map.vmf",self.data)
+		autoskycore.pipeFile(self.path("map.vmf"),self.path("map.vmf.gz"))
+		self.assertEqual(gzip.decompress(open(self.path("map.vmf.gz"),"rb").read()),self.data)
+		autoskycore.pipeFile(self.path("map.vmf.gz"),self.path("copy.vmf"))
+		self.assertEqual(self.read("copy.vmf"),self.data)
+
+	def testRecompressAsZstandard(self):
+		try:
+			import zstandard
+		except ImportError:
+			self.skipTest("zstandard isn't installed")
+		self.write("map.vmf.gz",self.data)
+		autoskycore.pipeFile(self.path("map.vmf.gz"),self.path("map.vmf.zst"))
+		self.assertEqual(self.read("map.vmf.zst"),self.data)
+
+	def testMissingSourceRaises(self):
+		with self.assertRaises(FileNotFoundError):
+			autoskycore.pipeFile(self.path("missing.vmf"),self.path("copy.vmf"))
+
+	def testUnwritableTargetRaises(self):
+		self.write("map.vmf.gz",self.data)
+		with self.assertRaises(OSError):
+			autoskycore.pipeFile(self.path("map.vmf.gz"),self.path(os.path.join("missing","copy.vmf")))
+
+	def testCorruptSourceRaises(self):
+		with open(self.path("map.vmf.gz"),"wb") as f:
+			f.write(b"not gzip at all" * 100)
+		with self.assertRaises(OSError):
+			autoskycore.pipeFile(self.path("map.vmf.gz"),self.path("copy.vmf"))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,313 @@
+import types
+import unittest
+from unittest import mock
+
+import autoskycore
+
+numpy = autoskycore.importNumpy()
+
+#Stand-ins for PyVMF's vertices, sides and solids, with just the attributes the geometry helpers use
+class Vertex:
+	def __init__(self,x,y,z):
+		self.x, self.y, self.z = x, y, z
+
+	def __str__(self):
+		return f"{self.x} {self.y} {self.z}"
+
+class Side:
+	def __init__(self,points,material="BRICK/BRICKWALL001",lightmapscale=16):
+		self.plane = [Vertex(*point) for point in points]
+		self.material = material
+		self.uaxis = "[1 0 0 0] 0.25"
+		self.vaxis = "[0 -1 0 0] 0.25"
+		self.lightmapscale = lightmapscale
+		self.dispinfo = None
+
+class Solid:
+	def __init__(self,sides):
+		self.side = sides
+
+#Returns an axis-aligned box from mins to maxs, with its sides' plane points wound as Hammer writes them
+def makeBox(mins,maxs):
+	(x0,y0,z0), (x1,y1,z1) = mins, maxs
+	return Solid([Side([(x0,y1,z1),(x1,y1,z1),(x1,y0,z1)]),
+					Side([(x0,y0,z0),(x1,y0,z0),(x1,y1,z0)]),
+					Side([(x0,y0,z1),(x0,y1,z1),(x0,y1,z0)]),
+					Side([(x1,y0,z0),(x1,y1,z0),(x1,y1,z1)]),
+					Side([(x1,y1,z0),(x0,y1,z0),(x0,y1,z1)]),
+					Side([(x0,y0,z0),(x0,y0,z1),(x1,y0,z1)])])
+
+@unittest.skipIf(numpy is None,"NumPy isn't installed")
+class ValidateSolidsTest(unittest.TestCase):
+	def testBoxIsValid(self):
+		self.assertEqual(autoskycore.validateSolids([makeBox((0,0,0),(64,32,16))],numpy),({},0))
+
+	def testThinSlabIsInvalid(self):
+		invalid, outOfBounds = autoskycore.validateSolids([makeBox((0,0,0),(64,64,0.1))],numpy)
+		self.assertEqual(list(invalid),[0])
+		self.assertIn("thinner",invalid[0])
+
+	def testNonConvexSolidIsInvalid(self):
+		solid = makeBox((0,0,0),(8,8,8))
+		solid.side[0] = Side([(0,8,8),(12,8,8),(12,0,8)]) #A top face reaching past the solid's +x side
+		invalid, outOfBounds = autoskycore.validateSolids([makeBox((0,0,0),(8,8,8)),solid],numpy)
+		self.assertEqual(invalid,{1:"not convex"})
+
+	def testDegenerateFaceIsInvalid(self):
+		solid = makeBox((0,0,0),(8,8,8))
+		solid.side[0] = Side([(0,0,8),(1,0,8),(2,0,8)])
+		invalid, outOfBounds = autoskycore.validateSolids([solid],numpy)
+		self.assertEqual(invalid,{0:"with degenerate faces"})
+
+	def testSolidsPastCoordinateLimitsAreCounted(self):
+		invalid, outOfBounds = autoskycore.validateSolids([makeBox((0,0,0),(20000,8,8)),makeBox((0,0,0),(8,8,8))],numpy)
+		self.assertEqual((invalid,outOfBounds),({},1))
+
+#Stand-ins for PyVMF's props and other entities, with just the attributes consolidateItems uses
+class Entity:
+	def __init__(self,id,**keyvalues):
+		self.id = id
+		self.editor = object()
+		for key, val in keyvalues.items():
+			setattr(self,key,val)
+
+class PropStatic(Entity):
+	pass
+
+class PropDynamic(Entity):
+	pass
+
+class SolidKeyTest(unittest.TestCase):
+	def testSamePlanesGiveTheSameKey(self):
+		box = makeBox((0,0,0),(64,32,16))
+		same = makeBox((0,0,0),(64,32,16))
+		same.side[0] = Side([(-64,32,16),(64,32,16),(64,-32,16)]) #The top plane, through different points (wound the same way)
+		same.side.reverse()
+		self.assertEqual(autoskycore.getSolidKey(box),autoskycore.getSolidKey(same))
+
+	def testDifferentGeometryOrTexturesGiveDifferentKeys(self):
+		key = autoskycore.getSolidKey(makeBox((0,0,0),(64,32,16)))
+		self.assertNotEqual(autoskycore.getSolidKey(makeBox((0,0,0),(64,32,32))),key)
+		retextured = makeBox((0,0,0),(64,32,16))
+		retextured.side[3].material = "BRICK/BRICKWALL002"
+		self.assertNotEqual(autoskycore.getSolidKey(retextured),key)
+		realigned = makeBox((0,0,0),(64,32,16))
+		realigned.side[3].uaxis = "[1 0 0 16] 0.25"
+		self.assertNotEqual(autoskycore.getSolidKey(realigned),key)
+
+	def testMaterialCaseIsIgnored(self):
+		lower = makeBox((0,0,0),(64,32,16))
+		for side in lower.side:
+			side.material = side.material.lower()
+		self.assertEqual(autoskycore.getSolidKey(lower),autoskycore.getSolidKey(makeBox((0,0,0),(64,32,16))))
+
+	def testDisplacedSolidsHaveNoKey(self):
+		solid = makeBox((0,0,0),(64,32,16))
+		solid.side[0].dispinfo = object()
+		self.assertIsNone(autoskycore.getSolidKey(solid))
+
+	def testPropKeyIgnoresIdAndEditor(self):
+		prop = PropStatic(1,model="models/a.mdl",origin=Vertex(0,0,0),angles="0 90 0")
+		self.assertEqual(autoskycore.getPropKey(prop),autoskycore.getPropKey(PropStatic(2,model="models/a.mdl",origin=Vertex(0,0,0),angles="0 90 0")))
+		self.assertNotEqual(autoskycore.getPropKey(prop),autoskycore.getPropKey(PropStatic(3,model="models/a.mdl",origin=Vertex(0,0,8),angles="0 90 0")))
+
+class ConsolidateItemsTest(unittest.TestCase):
+	def setUp(self):
+		patcher = mock.patch.object(autoskycore,"PyVMF",types.SimpleNamespace(Solid=Solid,PropStatic=PropStatic,PropDynamic=PropDynamic))
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def testDuplicatesAreDroppedAndCounted(self):
+		box = makeBox((0,0,0),(64,32,16))
+		prop = PropStatic(2,model="models/a.mdl",origin=Vertex(0,0,0))
+		dynamic = PropDynamic(3,model="models/a.mdl",origin=Vertex(0,0,0))
+		light = Entity(4,classname="light")
+		items = [box,prop,makeBox((0,0,0),(64,32,16)),dynamic,PropStatic(5,model="models/a.mdl",origin=Vertex(0,0,0)),light,Entity(6,classname="light")]
+		kept, duplicateSolids, duplicateEntities, mergedSolids = autoskycore.consolidateItems(items)
+		#A prop_dynamic is never a duplicate of a prop_static, and entities other than props are never dropped
+		self.assertEqual(kept,[box,prop,dynamic,light,items[6]])
+		self.assertEqual((duplicateSolids,duplicateEntities,mergedSolids),(1,1,0))
+
+	def testMergedBoxesAreCounted(self):
+		lower = makeBox((0,0,0),(64,32,16))
+		items = [lower,makeBox((0,0,16),(64,32,32)),makeBox((0,0,32),(64,32,48)),makeBox((128,0,0),(160,32,16))]
+		kept, duplicateSolids, duplicateEntities, mergedSolids = autoskycore.consolidateItems(items)
+		self.assertEqual(kept,[lower,items[3]])
+		self.assertEqual((duplicateSolids,duplicateEntities,mergedSolids),(0,0,2))
+		self.assertEqual(autoskycore.getBox(lower)[:2],((0,0,0),(64,32,48)))
+
+	def testDisplacedSolidsAreKept(self):
+		first = makeBox((0,0,0),(64,32,16))
+		second = makeBox((0,0,0),(64,32,16))
+		first.side[0].dispinfo = second.side[0].dispinfo = object()
+		self.assertEqual(autoskycore.consolidateItems([first,second]),([first,second],0,0,0))
+
+class OptimizeLightmapsTest(unittest.TestCase):
+	#Everything at x <= 0 is playable, so a face's distance from it is just its centre's x
+	playable = ((-10000,-10000,-10000),(0,10000,10000))
+
+	def getScales(self,solid):
+		return [side.lightmapscale for side in solid.side]
+
+	def testNearbySmallFacesAreUnchanged(self):
+		box = makeBox((0,0,0),(64,64,64))
+		self.assertEqual(autoskycore.optimizeLightmaps([box],None,16,128),(96,96))
+		self.assertEqual(self.getScales(box),[16]*6)
+
+	def testScaleFollowsDistance(self):
+		#The -x face is 1024 units away (scale 32); the +x face 1088, and the others' centres 1056 (both rounded up to 64)
+		box = makeBox((1024,0,0),(1088,16,16))
+		self.assertEqual(autoskycore.optimizeLightmaps([box],self.playable,16,128),(18,6))
+		self.assertEqual(self.getScales(box),[64,64,32,64,64,64])
+
+	def testScaleIsClamped(self):
+		box = makeBox((1024,0,0),(1088,16,16))
+		autoskycore.optimizeLightmaps([box],self.playable,16,32)
+		self.assertEqual(self.getScales(box),[32]*6)
+		near = makeBox((0,0,0),(8,8,8))
+		autoskycore.optimizeLightmaps([near],None,4,128)
+		self.assertEqual(self.getScales(near),[16]*6) #Never finer than it already was, even when minScale allows it
+
+	def testLargeFacesAreCoarsenedByArea(self):
+		#The top and bottom are 4096 units across, i.e. 256 luxels at scale 16; scale 128 brings them down to maxLuxelsAcross
+		slab = makeBox((0,0,0),(4096,4096,16))
+		before, after = autoskycore.optimizeLightmaps([slab],None,16,1024)
+		self.assertEqual(self.getScales(slab),[128,128,16,16,16,16])
+		self.assertEqual((before,after),(2*65536 + 4*256,2*1024 + 4*256))
+
+	def testCoarserScalesAreKept(self):
+		box = makeBox((0,0,0),(64,64,64))
+		box.side[0].lightmapscale = 64
+		autoskycore.optimizeLightmaps([box],None,16,32)
+		self.assertEqual(box.side[0].lightmapscale,64)
+
+	def testToolFacesAreSkipped(self):
+		box = makeBox((2048,0,0),(2112,64,64))
+		for side in box.side:
+			side.material = "TOOLS/TOOLSNODRAW"
+		self.assertEqual(autoskycore.optimizeLightmaps([box],self.playable,16,128),(0,0))
+		self.assertEqual(self.getScales(box),[16]*6)
+
+class MergeBoxesTest(unittest.TestCase):
+	def testStackedBoxesAreMerged(self):
+		lower = makeBox((0,0,0),(64,32,16))
+		upper = makeBox((0,0,16),(64,32,48))
+		self.assertEqual(autoskycore.mergeBoxes([upper,lower]),[upper])
+		mins, maxs, faces = autoskycore.getBox(lower)
+		self.assertEqual((mins,maxs),((0,0,0),(64,32,48)))
+
+	def testRowIsMergedIntoOneBox(self):
+		boxes = [makeBox((x,0,0),(x + 16,16,16)) for x in (32,0,16)]
+		self.assertEqual(len(autoskycore.mergeBoxes(boxes)),2)
+		kept = [box for box in boxes if autoskycore.getBox(box)[:2] == ((0,0,0),(48,16,16))]
+		self.assertEqual(len(kept),1)
+
+	def testDifferentTexturesAreNotMerged(self):
+		lower = makeBox((0,0,0),(64,32,16))
+		upper = makeBox((0,0,16),(64,32,48))
+		upper.side[2].material = "BRICK/BRICKWALL002"
+		self.assertEqual(autoskycore.mergeBoxes([lower,upper]),[])
+		self.assertEqual(autoskycore.getBox(lower)[:2],((0,0,0),(64,32,16)))
+
+	def testPartlySharedFacesAreNotMerged(self):
+		self.assertEqual(autoskycore.mergeBoxes([makeBox((0,0,0),(64,32,16)),makeBox((0,0,16),(32,32,48))]),[])
+
+	def testSeparatedBoxesAreNotMerged(self):
+		self.assertEqual(autoskycore.mergeBoxes([makeBox((0,0,0),(64,32,16)),makeBox((0,0,32),(64,32,48))]),[])
+
+class GetFaceAreasTest(unittest.TestCase):
+	def testBox(self):
+		areas = autoskycore.getFaceAreas(makeBox((0,0,0),(64,32,16)))
+		self.assertEqual(areas,[(2048,(32,16,16)),(2048,(32,16,0)),(512,(0,16,8)),(512,(64,16,8)),(1024,(32,32,8)),(1024,(32,0,8))])
+
+	def testWedge(self):
+		#A triangular prism: a right triangle with 64 unit legs, 32 units tall
+		wedge = Solid([Side([(0,0,32),(64,0,32),(0,64,32)]),
+						Side([(0,0,0),(0,64,0),(64,0,0)]),
+						Side([(0,0,0),(0,0,32),(0,64,0)]),
+						Side([(0,0,0),(64,0,0),(0,0,32)]),
+						Side([(64,0,0),(0,64,0),(64,0,32)])])
+		areas = autoskycore.getFaceAreas(wedge)
+		for (area, centre), (expectedArea, expectedCentre) in zip(areas,[(2048,(64/3,64/3,32)),(2048,(64/3,64/3,0)),(2048,(0,32,16)),(2048,(32,0,16)),(2048 * 2 ** 0.5,(32,32,16))]):
+			self.assertAlmostEqual(area,expectedArea,places=6)
+			for value, expected in zip(centre,expectedCentre):
+				self.assertAlmostEqual(value,expected,places=6)
+		self.assertEqual(len(areas),5)
+
+#Stand-in for a PyVMF dispinfo of power 1 (3x3 vertices), whose distances and offsets rows are made by makeRow from each row's numbers
+def makeDispinfo(distances,offsets,makeRow):
+	rows = lambda values, width: types.SimpleNamespace(**{f"row{i}":makeRow(values[i*width:(i+1)*width]) for i in range(3)})
+	return types.SimpleNamespace(power="1",elevation="2",startposition=Vertex(16,32,-48),distances=rows(distances,3),offsets=rows(offsets,9))
+
+def asString(values):
+	return " ".join(autoskycore.formatNumber(val) for val in values)
+
+def asVertices(values):
+	return [Vertex(*values[i:i+3]) for i in range(0,len(values),3)]
+
+class DispRowsTest(unittest.TestCase):
+	def testStringRowsKeepTheirForm(self):
+		dispinfo = makeDispinfo([0,1,2,3,4,5,6,7,8],list(range(27)),asString)
+		autoskycore.setDispRows(dispinfo,"distances",[0.5*i for i in range(9)])
+		self.assertEqual(autoskycore.getDispRows(dispinfo,"distances"),["0 0.5 1","1.5 2 2.5","3 3.5 4"])
+
+	def testListRowsKeepTheirForm(self):
+		dispinfo = makeDispinfo([0,1,2,3,4,5,6,7,8],list(range(27)),list)
+		autoskycore.setDispRows(dispinfo,"distances",[0.5*i for i in range(9)])
+		self.assertEqual(autoskycore.getDispRows(dispinfo,"distances"),[[0,0.5,1],[1.5,2,2.5],[3,3.5,4]])
+
+	def testVertexRowsKeepTheirVertices(self):
+		dispinfo = makeDispinfo([0]*9,list(range(27)),asVertices)
+		vertex = dispinfo.offsets.row1[2]
+		autoskycore.setDispRows(dispinfo,"offsets",[-i for i in range(27)])
+		rows = autoskycore.getDispRows(dispinfo,"offsets")
+		self.assertIs(rows[1][2],vertex)
+		self.assertEqual((vertex.x,vertex.y,vertex.z),(-15,-16,-17))
+		self.assertEqual([val for row in rows for val in autoskycore.flattenRow(row)],[-i for i in range(27)])
+
+	def testNestedRowsKeepTheirShape(self):
+		row = [[1,2,3],(4,5,6)]
+		self.assertEqual(autoskycore.refillRow(row,iter([6,5,4,3,2,1])),[[6,5,4],(3,2,1)])
+
+	def testNumbersKeepTheirPrecision(self):
+		for val in (1/3,123456.789012,-0.1,1e-7,16.0):
+			self.assertEqual(float(autoskycore.formatNumber(val)),val)
+		self.assertEqual(autoskycore.formatNumber(16.0),"16")
+
+@unittest.skipIf(numpy is None,"NumPy isn't installed")
+class DisplacementTest(unittest.TestCase):
+	def check(self,makeRow,read):
+		distances = [1/3*i for i in range(9)]
+		offsets = [1.25*i - 7 for i in range(27)]
+		dispinfo = makeDispinfo(distances,offsets,makeRow)
+		displacement = autoskycore.Displacement(dispinfo,numpy)
+		displacement.scale(Vertex(16,0,0),1/16)
+		displacement.writeRows()
+		start = dispinfo.startposition
+		self.assertEqual((start.x,start.y,start.z),(16,2,-3))
+		self.assertEqual(dispinfo.elevation,0.125)
+		self.assertEqual(read(autoskycore.getDispRows(dispinfo,"distances")),[val/16 for val in distances])
+		self.assertEqual(read(autoskycore.getDispRows(dispinfo,"offsets")),[val/16 for val in offsets])
+
+	def testStringRows(self):
+		self.check(asString,lambda rows: [float(val) for row in rows for val in row.split()])
+
+	def testListRows(self):
+		self.check(list,lambda rows: [val for row in rows for val in row])
+
+	def testVertexRows(self):
+		self.check(asVertices,lambda rows: [val for row in rows for val in autoskycore.flattenRow(row)])
+
+	def testScaleSolidScalesDisplacementsSeparately(self):
+		solid = makeBox((0,0,0),(64,64,16))
+		dispinfo = makeDispinfo([8]*9,[0]*27,asString)
+		solid.side[0].dispinfo = dispinfo
+		seen = []
+		solid.scale = lambda origin, x, y, z: seen.append([side.dispinfo for side in solid.side])
+		autoskycore.scaleSolid(solid,Vertex(0,0,0),0.5,numpy)
+		self.assertEqual(seen,[[None]*6])
+		self.assertIs(solid.side[0].dispinfo,dispinfo)
+		self.assertEqual(autoskycore.getDispRows(dispinfo,"distances"),["4 4 4"]*3)
+
+if __name__ == "__main__":
+	unittest.main()
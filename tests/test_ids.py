@@ -0,0 +1,70 @@
+import unittest
+
+import autoskycore
+
+#Stand-ins for PyVMF's VMF, solids and entities, with just the attributes IdAllocator and insertItems use
+class Item:
+	def __init__(self,id,sideIds=(),solids=()):
+		self.id = id
+		self.side = [Item(sideId) for sideId in sideIds]
+		self.solids = list(solids)
+
+class World:
+	def __init__(self,solids):
+		self.solids = list(solids)
+
+class VMF:
+	def __init__(self,solids=(),entities=()):
+		self.world = World(solids)
+		self.entities = list(entities)
+
+	def get_solids(self,include_hidden,include_solid_entities):
+		return self.world.solids + [solid for entity in self.entities for solid in entity.solids]
+
+	def get_entities(self,include_hidden,include_solid_entities):
+		return list(self.entities)
+
+class IdAllocatorTest(unittest.TestCase):
+	def testEmptyVMF(self):
+		self.assertEqual(autoskycore.IdAllocator(VMF()).reserve(1,1),(2,1))
+
+	def testStartsAfterUsedIds(self):
+		brushEntity = Item("40",solids=[Item("12",["90","91"])])
+		vmf = VMF([Item("3",["5","6"]),Item("7",["8"])],[Item("20"),brushEntity])
+		self.assertEqual(autoskycore.IdAllocator(vmf).reserve(0),(41,92))
+
+	def testReservesContiguousRanges(self):
+		ids = autoskycore.IdAllocator(VMF([Item("3",["5","6"])]))
+		self.assertEqual(ids.reserve(2,12),(4,7))
+		self.assertEqual(ids.reserve(1,6),(6,19))
+		self.assertEqual(ids.reserve(0),(7,25))
+
+class InsertItemsTest(unittest.TestCase):
+	def testNumbersAndAddsItems(self):
+		existing = Item("3",["5","6"])
+		vmf = VMF([existing],[Item("4")])
+		ids = autoskycore.IdAllocator(vmf)
+		solids = [Item(None,[None,None]),Item(None,[None])]
+		entitySolid = Item(None,[None,None,None])
+		entities = [Item(None),Item(None,solids=[entitySolid])]
+		autoskycore.insertItems(vmf,ids,solids,entities,[entitySolid])
+
+		self.assertEqual(vmf.world.solids,[existing] + solids)
+		self.assertEqual(vmf.entities[1:],entities)
+		allIds = [int(item.id) for item in vmf.world.solids + vmf.entities + [entitySolid]]
+		self.assertEqual(sorted(allIds),list(range(3,3 + len(allIds))))
+		sideIds = [int(side.id) for solid in vmf.get_solids(True,True) for side in solid.side]
+		self.assertEqual(sorted(sideIds),list(range(5,5 + len(sideIds))))
+
+	def testLaterInsertsDontClash(self):
+		vmf = VMF()
+		ids = autoskycore.IdAllocator(vmf)
+		first = Item(None,[None])
+		second = Item(None,[None])
+		autoskycore.insertItems(vmf,ids,[first],[])
+		autoskycore.insertItems(vmf,ids,[second],[])
+		self.assertNotEqual(first.id,second.id)
+		self.assertNotEqual(first.side[0].id,second.side[0].id)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,33 @@
+import types
+import unittest
+
+import autoskycore
+
+class SkyboxInstancesTest(unittest.TestCase):
+	def setUp(self):
+		self.generator = autoskycore.SkyboxGenerator({})
+		self.profiles = [{**autoskycore.defaultProfile,"outputPath":f"sky{i}.vmf"} for i in range(3)]
+
+	def testInstanceHeightIsSnappedOffsetBelow(self):
+		self.assertEqual(self.generator.getSkyboxInstanceHeight(-100,self.profiles[0]),-320)
+		self.assertEqual(self.generator.getSkyboxInstanceHeight(-128,self.profiles[0]),-320)
+
+	def testStackedInstancesFit(self):
+		#As addSkyboxInstances places them below a map reaching down to z=-100: the first at -320, and the second 192 units below the first's bottom at -770, once
+		#snapped down to -832
+		self.assertTrue(self.generator.skyboxInstancesFit([-320,-1024,-2048],self.profiles,[450,500,600]))
+
+	def testGrownSkyboxNoLongerFits(self):
+		self.assertFalse(self.generator.skyboxInstancesFit([-320,-1024,-2048],self.profiles,[700,500,600]))
+		self.assertFalse(self.generator.skyboxInstancesFit([-320,-1024,-2048],self.profiles,[450,1000,600]))
+
+	def testSingleInstanceAlwaysFits(self):
+		self.assertTrue(self.generator.skyboxInstancesFit([-320],self.profiles[:1],[100000]))
+
+	def testInstanceHeight(self):
+		self.assertEqual(autoskycore.getInstanceHeight(types.SimpleNamespace(origin="0 0 -320")),-320)
+		self.assertEqual(autoskycore.getInstanceHeight(types.SimpleNamespace(origin=types.SimpleNamespace(x=0,y=0,z=-64))),-64)
+		self.assertEqual(autoskycore.getInstanceHeight(types.SimpleNamespace(other={"origin":"16 0 -832.5"})),-832.5)
+
+if __name__ == "__main__":
+	unittest.main()
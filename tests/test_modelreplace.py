@@ -0,0 +1,61 @@
+import os.path
+import tempfile
+import unittest
+
+import autoskycore
+
+class ModelReplaceIndexTest(unittest.TestCase):
+	def setUp(self):
+		self.builtin = {"models/props/Tree01.mdl":"models/props/tree01_skybox.mdl",
+						"models/props/rock01.mdl":"models/props/rock01_sky.mdl",
+						"models/foliage/bush.mdl":"models/foliage/bush_skybox.mdl"}
+		self.user = {"models/custom/tower.mdl":"models/custom/tower_small.mdl"}
+		self.index = autoskycore.ModelReplaceIndex(self.builtin,self.user)
+
+	def getModels(self,positions):
+		return [self.index.models[i] for i in positions]
+
+	def testModelsAreSortedIgnoringCase(self):
+		self.assertEqual(self.index.models,["models/custom/tower.mdl","models/foliage/bush.mdl","models/props/rock01.mdl","models/props/Tree01.mdl"])
+
+	def testUserReplacementsOverrideBuiltIn(self):
+		self.user["models/props/rock01.mdl"] = "models/props/rock01_custom.mdl"
+		self.index.add("models/props/rock01.mdl")
+		self.assertEqual(len(self.index),4)
+		self.assertEqual(self.index.getSkyboxModel("models/props/rock01.mdl"),"models/props/rock01_custom.mdl")
+		self.assertTrue(self.index.isCustom("models/props/rock01.mdl"))
+		self.assertEqual(self.getModels(self.index.search("custom")),["models/custom/tower.mdl","models/props/rock01.mdl"])
+
+	def testSearchListsPrefixMatchesFirst(self):
+		self.assertEqual(self.getModels(self.index.search("models/p")),["models/props/rock01.mdl","models/props/Tree01.mdl"])
+		self.assertEqual(self.getModels(self.index.search("SKYBOX")),["models/foliage/bush.mdl","models/props/Tree01.mdl"])
+		self.assertEqual(self.getModels(self.index.search("")),self.index.models)
+
+	def testNarrowedSearchMatchesFreshSearch(self):
+		self.index.search("o")
+		narrowed = self.getModels(self.index.search("ock"))
+		fresh = autoskycore.ModelReplaceIndex(self.builtin,self.user)
+		self.assertEqual(narrowed,[fresh.models[i] for i in fresh.search("ock")])
+		self.assertEqual(narrowed,["models/props/rock01.mdl"])
+
+	def testAddAndRemoveKeepIndexSorted(self):
+		self.user["models/props/tree01.mdl"] = "models/props/tree01_lower.mdl" #Differs only in case from a built-in model
+		self.index.add("models/props/tree01.mdl")
+		self.assertEqual(len(self.index),5)
+		self.assertEqual(self.index.models[self.index.find("models/props/tree01.mdl")],"models/props/tree01.mdl")
+		del self.user["models/custom/tower.mdl"]
+		self.index.remove("models/custom/tower.mdl")
+		self.assertEqual(self.index.models,sorted(self.index.models,key=str.lower))
+		self.assertEqual(self.index.search("tower"),[])
+
+class ModelreplaceFileTest(unittest.TestCase):
+	def testFilesRoundTrip(self):
+		pairs = [("models/a.mdl","models/a_sky.mdl"),("models/b, c.mdl","models/b_sky.mdl")]
+		with tempfile.TemporaryDirectory() as directory:
+			for name in ("index.csv","index.json"):
+				path = os.path.join(directory,name)
+				autoskycore.writeModelreplaceFile(path,pairs)
+				self.assertEqual(autoskycore.readModelreplaceFile(path),pairs)
+
+if __name__ == "__main__":
+	unittest.main()
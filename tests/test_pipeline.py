@@ -0,0 +1,76 @@
+import unittest
+
+import autoskycore
+
+#Builds a pipeline of stub stages: "base" makes a fresh list, "reader" sums it, and "consumer" reads "reader" and then consumes and modifies "base", as
+#transform does with extract. Each stage records how often it ran
+class PipelineTest(unittest.TestCase):
+	def setUp(self):
+		self.runs = {"base":0,"reader":0,"consumer":0}
+
+		def base(options):
+			self.count("base")
+			return [1,2,3]
+
+		def reader(options,items):
+			self.count("reader")
+			return sum(items)
+
+		def consumer(options,total,items):
+			self.count("consumer")
+			items.append(options["variant"])
+			return total,items
+
+		self.pipeline = autoskycore.Pipeline({"base":autoskycore.Stage(base),
+												"reader":autoskycore.Stage(reader,("base",)),
+												"consumer":autoskycore.Stage(consumer,("reader","base"),("variant",),consumes=lambda options: ("base",))})
+
+	def count(self,name):
+		self.runs[name] += 1
+
+	def testResultsAreReused(self):
+		self.pipeline.evaluate("consumer",{"variant":1})
+		self.pipeline.evaluate("consumer",{"variant":1})
+		self.assertEqual(self.runs,{"base":1,"reader":1,"consumer":1})
+
+	#Each consumer is handed a result of its own to modify, and a consumed result is no longer stored
+	def testConsumersNeverShareAResult(self):
+		first = self.pipeline.evaluate("consumer",{"variant":1})
+		second = self.pipeline.evaluate("consumer",{"variant":2})
+		self.assertEqual((first,second),((6,[1,2,3,1]),(6,[1,2,3,2])))
+		self.assertEqual(self.runs,{"base":2,"reader":1,"consumer":2})
+
+	def testTakenResultIsNotStored(self):
+		first = self.pipeline.evaluate("base",{},True)
+		second = self.pipeline.evaluate("base",{},True)
+		self.assertIsNot(first,second)
+		self.assertEqual(self.runs["base"],2)
+
+	#As assemble does in copy-free runs, "finish" consumes both "base" and "summary", which is built from "base": "base" has to be taken last, or building
+	#"summary" would build it again
+	def testConsumedInputUpstreamOfAnotherIsTakenLast(self):
+		def summary(options,items):
+			self.count("summary")
+			return [len(items)]
+		pipeline = autoskycore.Pipeline({"base":self.pipeline.stages["base"],
+											"summary":autoskycore.Stage(summary,("base",)),
+											"finish":autoskycore.Stage(lambda options, items, counts: items + counts,("base","summary"),consumes=lambda options: ("base","summary"))})
+		self.runs["summary"] = 0
+		self.assertEqual(pipeline.evaluate("finish",{}),[1,2,3,3])
+		self.assertEqual(self.runs,{"base":1,"reader":0,"consumer":0,"summary":1})
+		self.assertEqual(list(pipeline.results),[pipeline.getKey("finish",{},{})])
+
+	def testDiscardWhereDropsDependentResults(self):
+		pipeline = autoskycore.Pipeline({"load":autoskycore.Stage(lambda options: object(),options=("inputPath","inputStamp")),
+											"use":autoskycore.Stage(lambda options, loaded: [loaded],("load",),("scale",))})
+		old = {"inputPath":"a.vmf","inputStamp":1,"scale":16}
+		other = {"inputPath":"b.vmf","inputStamp":1,"scale":16}
+		oldResult = pipeline.evaluate("use",old)
+		otherResult = pipeline.evaluate("use",other)
+		pipeline.discardWhere(lambda scope: scope["inputPath"] == "a.vmf" and scope["inputStamp"] != 2)
+		self.assertEqual(len(pipeline.results),2)
+		self.assertIsNot(pipeline.evaluate("use",old),oldResult)
+		self.assertIs(pipeline.evaluate("use",other),otherResult)
+
+if __name__ == "__main__":
+	unittest.main()
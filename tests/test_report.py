@@ -0,0 +1,25 @@
+import unittest
+
+import autoskycore
+
+class DescribeStatsTest(unittest.TestCase):
+	def testNothingToReport(self):
+		self.assertEqual(autoskycore.describeStats("AutoSky",{}),[])
+		stats = {"duplicateSolids":0,"duplicateEntities":0,"mergedSolids":0,"luxels":(100,100),"removed":{},"flagged":{},"outOfBounds":0}
+		self.assertEqual(autoskycore.describeStats("AutoSky",stats),[])
+
+	def testEveryStatIsReported(self):
+		stats = {"duplicateSolids":2,"duplicateEntities":1,"mergedSolids":3,
+					"luxels":(400,100),
+					"removed":{0:"not convex",4:"not convex"},
+					"flagged":{7:"thinner than 0.25 units"},
+					"outOfBounds":1}
+		self.assertEqual(autoskycore.describeStats("Far",stats),
+							["Far: removed 2 duplicate brush(es) and 1 duplicate entity/entities, and merged 3 brush(es) into their neighbours",
+								"Far: coarsened lightmaps from 400 to 100 luxels (75% fewer)",
+								"Far: removed 2 brush(es) vbsp would reject (2 not convex)",
+								"Far: 1 brush entity brush(es) would be rejected by vbsp and need fixing by hand (1 thinner than 0.25 units)",
+								f"Far: 1 brush(es) extend past the map's coordinate limits (±{autoskycore.maxCoord} units) and may stop the map compiling"])
+
+if __name__ == "__main__":
+	unittest.main()
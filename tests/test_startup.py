@@ -0,0 +1,20 @@
+import subprocess
+import sys
+import unittest
+
+import autoskycore
+
+class StartupTest(unittest.TestCase):
+	#Takes the best of a few runs, as python autoskycore.py does, so a busy machine doesn't fail the test
+	def testImportIsWithinBudget(self):
+		importTime = min(autoskycore.measureImportTime() for i in range(5))
+		self.assertLessEqual(importTime,autoskycore.startupBudget)
+
+	#The heavy modules are only imported once they're needed
+	def testImportDefersHeavyModules(self):
+		script = "import sys, autoskycore; print(sorted(name for name in ('PyVMF_for_AutoSky.src.PyVMF','builtinmodelreplace','numpy','sqlite3','tkinter') if name in sys.modules))"
+		result = subprocess.run([sys.executable,"-c",script],cwd=autoskycore.getDataPath(""),capture_output=True,text=True,check=True)
+		self.assertEqual(result.stdout.strip(),"[]")
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,71 @@
+import json
+import os.path
+import tempfile
+import unittest
+
+import autoskycore
+
+class StoreTest(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.directory.name,"autosky.db")
+		self.stores = []
+
+	def tearDown(self):
+		for store in self.stores:
+			store.close()
+		self.directory.cleanup()
+
+	def open(self):
+		store = autoskycore.Store(self.path)
+		self.stores.append(store)
+		return store
+
+	def writeJSON(self,name,value):
+		with open(os.path.join(self.directory.name,name),"w") as f:
+			json.dump(value,f)
+
+	def testSettingsRoundTrip(self):
+		store = self.open()
+		self.assertEqual(store.getSettings(),{})
+		store.setSettings({"scale":32,"profiles":[{"visgroup":"Far"}]})
+		store.setSetting("skyboxOnly",True)
+		self.assertEqual(store.getSettings(),{"scale":32,"profiles":[{"visgroup":"Far"}],"skyboxOnly":True})
+		store.setSetting("scale",16)
+		self.assertEqual(self.open().getSettings()["scale"],16)
+
+	def testModelreplaceUpsertAndDelete(self):
+		store = self.open()
+		store.setManyModelreplace([("models/a.mdl","models/a_sky.mdl"),("models/b.mdl","models/b_sky.mdl")])
+		store.setModelreplace("models/a.mdl","models/a_sky2.mdl")
+		store.removeModelreplace("models/b.mdl")
+		store.removeModelreplace("models/missing.mdl")
+		self.assertEqual(store.getModelreplace(),{"models/a.mdl":"models/a_sky2.mdl"})
+		store.removeManyModelreplace(["models/a.mdl"])
+		self.assertEqual(store.getModelreplace(),{})
+
+	def testImportsJSONFiles(self):
+		self.writeJSON("config.json",{"scale":8})
+		self.writeJSON("modelreplace.json",{"models/a.mdl":"models/a_sky.mdl"})
+		store = self.open()
+		self.assertEqual(store.getSettings(),{"scale":8})
+		self.assertEqual(store.getModelreplace(),{"models/a.mdl":"models/a_sky.mdl"})
+		for name in ("config.json","modelreplace.json"):
+			self.assertFalse(os.path.exists(os.path.join(self.directory.name,name)))
+			self.assertTrue(os.path.exists(os.path.join(self.directory.name,name + ".imported")))
+
+	def testImportedJSONOverridesStoredSettings(self):
+		self.open().setSettings({"scale":32,"gridSnap":128})
+		self.writeJSON("config.json",{"scale":8})
+		self.assertEqual(self.open().getSettings(),{"scale":8,"gridSnap":128})
+
+	def testVersionChangesOnOtherConnectionsCommits(self):
+		reader = self.open()
+		writer = self.open()
+		version = reader.getVersion()
+		self.assertEqual(reader.getVersion(),version)
+		writer.setSetting("scale",4)
+		self.assertNotEqual(reader.getVersion(),version)
+
+if __name__ == "__main__":
+	unittest.main()